@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from collections import Counter
+from html import unescape
+from typing import Any
+import json
+import math
+import re
+
+from ..config import settings
+from ..models.response_models import IntermediateResult
+
+try:  # optional exact BPE counts; the estimate below is close enough for budgeting
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+_encoding: Any = None
+# Approximates BPE splitting: short words are one token, long ones one per ~4 characters,
+# every punctuation mark its own token.
+_TOKEN_PIECE = re.compile(r"[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]")
+_WORD = re.compile(r"\w[\w+#\-]*")
+_TAG = re.compile(r"<[^>]+>")
+_DDG_RESULT = re.compile(
+    r'class="result__a"[^>]*href="(?P<url>[^"]*)"[^>]*>(?P<title>.*?)</a>.*?'
+    r'class="result__snippet"[^>]*>(?P<snippet>.*?)</a>',
+    re.DOTALL,
+)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "was", "with", "you", "your", "we", "our", "can", "will", "not",
+}
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is not None and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # encodings are downloaded on first use; unavailable offline
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(_TOKEN_PIECE.findall(text))
+
+
+def _clean(text: str) -> str:
+    return " ".join(unescape(_TAG.sub(" ", text)).split())
+
+
+def render_result(result: Any) -> list[str]:
+    """Turn a tool result into short text passages, without dict/JSON syntax."""
+    if not isinstance(result, dict):
+        return [str(result)] if result else []
+    if result.get("error"):
+        return [f"Error: {result['error']}"]
+    passages: list[str] = []
+    if "results" in result:  # github_search
+        for repo in result["results"]:
+            details = ", ".join(
+                part for part in (
+                    f"{repo['stars']} stars" if repo.get("stars") is not None else "",
+                    repo.get("language") or "",
+                ) if part
+            )
+            line = f"{repo.get('name')}" + (f" ({details})" if details else "")
+            if repo.get("description"):
+                line += f": {repo['description']}"
+            if repo.get("url"):
+                line += f" <{repo['url']}>"
+            passages.append(line)
+    if isinstance(result.get("data"), dict):  # web_search via SerpAPI
+        data = result["data"]
+        if data.get("answer_box"):
+            box = data["answer_box"]
+            passages.append(_clean(str(box.get("answer") or box.get("snippet") or "")))
+        for item in data.get("organic_results", []):
+            passages.append(f"{item.get('title', '')}: {item.get('snippet', '')} <{item.get('link', '')}>")
+    if result.get("html_snippet"):  # web_search via DuckDuckGo HTML
+        for match in _DDG_RESULT.finditer(result["html_snippet"]):
+            passages.append(f"{_clean(match['title'])}: {_clean(match['snippet'])} <{unescape(match['url'])}>")
+    if result.get("text"):  # web_fetch, pdf_extract
+        source = result.get("title") or result.get("url") or result.get("source")
+        if source:
+            passages.append(f"Source: {source}")
+        passages.extend(p.strip() for p in re.split(r"\n\s*\n|\n", result["text"]) if p.strip())
+    if result.get("summary"):
+        passages.append(str(result["summary"]).strip())
+    if result.get("message"):
+        passages.append(str(result["message"]))
+    if not passages:
+        passages.append(json.dumps(result, ensure_ascii=False, default=str, separators=(",", ":")))
+    return [p for p in (" ".join(p.split()) for p in passages) if p]
+
+
+def _terms(text: str) -> Counter[str]:
+    return Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+
+
+def _shingles(text: str) -> set[str]:
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+class _Passage:
+    def __init__(self, step: int, order: int, text: str):
+        self.step = step
+        self.order = order
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.terms = _terms(text)
+        self.score = 0.0
+
+
+def _fit(passage: _Passage, budget: int) -> str | None:
+    # Trims a passage that does not fit to the words that do; tiny remainders are skipped.
+    if passage.tokens <= budget:
+        return passage.text
+    if budget < 32:
+        return None
+    words = passage.text.split()
+    keep = max(1, int(len(words) * budget / passage.tokens) - 1)
+    return " ".join(words[:keep]) + " ..."
+
+
+def pack_context(goal: str, intermediate: list[IntermediateResult], budget: int | None = None) -> str:
+    """Fit step outputs into ``budget`` tokens for the synthesis prompt.
+
+    Results are rendered to compact text and split into passages. Exact and near-duplicate
+    passages (e.g. the same repo from two searches) are kept once. Every step gets an equal
+    floor of the budget for its most relevant passages, and the remainder goes to the most
+    relevant passages overall, scored by TF-IDF overlap with the goal and step description.
+    Passages keep their original order within each step.
+    """
+    budget = budget or settings.SYNTHESIS_CONTEXT_TOKENS
+    passages: list[_Passage] = []
+    seen: list[int] = []  # shingle count of each kept passage
+    index: dict[str, list[int]] = {}  # shingle -> kept passages containing it
+    duplicated: set[int] = set()
+    for item in intermediate:
+        for order, text in enumerate(render_result(item.result)):
+            shingles = _shingles(text)
+            if not shingles:  # nothing to compare it by
+                passages.append(_Passage(item.step.id, order, text))
+                continue
+            # Only passages sharing a shingle can be near-duplicates; count the overlap with
+            # each through the index instead of intersecting with every earlier passage.
+            shared = Counter(kept for shingle in shingles for kept in index.get(shingle, ()))
+            if any(count >= 0.8 * min(len(shingles), seen[kept]) for kept, count in shared.items()):
+                duplicated.add(item.step.id)
+                continue
+            for shingle in shingles:
+                index.setdefault(shingle, []).append(len(seen))
+            seen.append(len(shingles))
+            passages.append(_Passage(item.step.id, order, text))
+    if not passages:
+        return ""
+
+    document_frequency: Counter[str] = Counter()
+    for passage in passages:
+        document_frequency.update(passage.terms.keys())
+    step_queries = {item.step.id: _terms(f"{goal} {item.step.description}") for item in intermediate}
+    total = len(passages)
+    for passage in passages:
+        query = step_queries.get(passage.step, Counter())
+        overlap = sum(
+            math.log(1 + passage.terms[term]) * math.log(1 + total / document_frequency[term])
+            for term in query
+            if term in passage.terms
+        )
+        # Normalised by length so long passages do not win on volume alone; earlier
+        # passages in a result (titles, top hits) get a small boost.
+        passage.score = overlap / math.sqrt(passage.tokens + 1) + 1.0 / (1 + passage.order)
+
+    header_cost = 12  # "Step N (description) =>" lines, per step
+    steps = [item.step.id for item in intermediate]
+    remaining = budget - header_cost * len(steps)
+    floor = max(0, remaining // (2 * max(1, len(steps))))
+    chosen: dict[tuple[int, int], str] = {}
+
+    def take(candidates: list[_Passage], limit: int) -> int:
+        used = 0
+        for passage in sorted(candidates, key=lambda p: p.score, reverse=True):
+            key = (passage.step, passage.order)
+            if key in chosen:
+                continue
+            text = _fit(passage, limit - used)
+            if text is None:
+                continue
+            chosen[key] = text
+            used += count_tokens(text) if text is not passage.text else passage.tokens
+            if used >= limit:
+                break
+        return used
+
+    for step_id in steps:
+        remaining -= take([p for p in passages if p.step == step_id], min(floor, remaining))
+    take(passages, max(0, remaining))
+
+    by_step: dict[int, list[str]] = {}
+    for (step_id, order), text in sorted(chosen.items()):
+        by_step.setdefault(step_id, []).append(text)
+    blocks = []
+    for item in intermediate:
+        lines = by_step.get(item.step.id)
+        if lines:
+            body = "\n".join(f"- {line}" for line in lines)
+        else:
+            body = "- (same as earlier steps)" if item.step.id in duplicated else "- (no output)"
+        blocks.append(f"Step {item.step.id} ({item.step.description}) =>\n{body}")
+    return "\n\n".join(blocks)
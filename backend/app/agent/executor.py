@@ -1,16 +1,30 @@
-from typing import Any
+from contextlib import aclosing
+from typing import Any, AsyncIterator
 import asyncio
+import json
 import logging
+import time
+import uuid
 
+from ..config import settings
+from ..services import deadline, tracing
+from ..services.analytics import latency_stats
+from ..services.datastore import run_store
+from ..services.hedging import hedger
+from ..services.metrics import plan_duration, run_duration, runs_in_flight, synthesis_duration, tool_duration
+from ..services.singleflight import normalize_input, single_flight
 from ..models.request_models import ExecuteRequest
 from ..models.response_models import (
     ExecuteResponse,
     IntermediateResult,
+    PlanResponse,
+    PlanStep,
     TimelineEntry,
 )
 from .planner import planner
-from .llm import llm_provider
-from ..tools import web_fetch, github_search, pdf_extract, web_search, summarize
+from .context_packer import pack_context
+from .llm import StreamInterrupted, llm_provider
+from .registry import tool_registry
 
 
 # Ensure logging configuration
@@ -19,87 +33,264 @@ logger = logging.getLogger("executor")
 
 class Executor:
     async def execute(self, req: ExecuteRequest) -> ExecuteResponse:
+        started = time.perf_counter()
         try:
-            # 1. Generate the plan
-            plan_resp = await planner.create_plan(req.plan_request)
-            
-            intermediate: list[IntermediateResult] = []
-            timeline: list[TimelineEntry] = []
-            loop = asyncio.get_running_loop()
-
-            # 2. Execute each step
-            for step in plan_resp.steps:
-                desc = step.description
-                tool_name = self.select_tool(desc)
-                
-                logger.info(f"Executing Step {step.id}: {desc} | Tool: {tool_name}")
-                start = loop.time()
-                
-                result_data = None
-                try:
-                    if tool_name == "web_fetch":
-                        result_data = await web_fetch.fetch(desc)
-                    elif tool_name == "github_search":
-                        result_data = await github_search.search(desc)
-                    elif tool_name == "pdf_extract":
-                        result_data = await pdf_extract.extract(desc)
-                    elif tool_name == "web_search":
-                        result_data = await web_search.search(desc)
-                    else:
-                        result_data = await summarize.summarize_text(desc)
-                except Exception as tool_error:
-                    logger.error(f"Tool {tool_name} failed: {tool_error}")
-                    # Instead of crashing, record the error so the agent can continue or report it
-                    result_data = {"error": f"Tool execution failed: {str(tool_error)}"}
-                
-                end = loop.time()
+            # Everything below, tool and LLM calls included, shares the run's time budget.
+            with (
+                tracing.span("agent.execute", goal=req.plan_request.goal) as run_span,
+                runs_in_flight.track(mode="sync"),
+                deadline.deadline_scope(req.deadline or settings.RUN_DEADLINE_SECONDS),
+            ):
+                # 1. Generate the plan
+                plan_resp = await self._plan(req)
+                use_cache = not req.plan_request.bypass_cache
+
+                # 2. Execute the steps as a dependency graph
+                tasks = self._schedule_steps(plan_resp.steps, req)
+                outcomes = await asyncio.gather(*tasks.values())
+                intermediate: list[IntermediateResult] = [result for result, _ in outcomes]
+                timeline: list[TimelineEntry] = [entry for _, entry in outcomes]
+
+                # 3. Synthesize results
+                context = await self._pack(req.plan_request.goal, intermediate)
+                prompt = self._synthesis_prompt(req.plan_request.goal, context)
+                with tracing.span("agent.synthesis") as synthesis_span, synthesis_duration.time():
+                    try:
+                        async with asyncio.timeout(self._time_left()):
+                            merged_summary = await llm_provider.complete(prompt, use_cache=use_cache, tier="heavy")
+                        cut_short = False
+                    except TimeoutError:
+                        merged_summary, cut_short = self._unsynthesized(context), True
+                    tracing.set_attributes(synthesis_span, cut_short=cut_short)
+
+                response = ExecuteResponse(
+                    run_id=uuid.uuid4().hex,
+                    plan=plan_resp.plan,
+                    intermediate=intermediate,
+                    final_summary=merged_summary,
+                    timeline=timeline,
+                    partial=cut_short or any(entry.status in ("timeout", "skipped") for entry in timeline),
+                )
+                tracing.set_attributes(run_span, run_id=response.run_id, partial=response.partial)
+            await self._record_run(response)
+            run_duration.observe(time.perf_counter() - started, mode="sync", partial=str(response.partial).lower())
+            return response
+        except Exception as executor_error:
+            logger.error(f"Executor failed: {executor_error}")
+            raise executor_error
 
-                timeline.append(TimelineEntry(step_id=step.id, tool=tool_name, duration=end - start))
-                intermediate.append(IntermediateResult(step=step, result=result_data))
-
-            # 3. Synthesize results
-            # SAFETY: Truncate individual results to avoid sending massive text blobs to the LLM
-            # We limit each step's output to 2000 characters for the final prompt.
-            result_blobs = []
-            for item in intermediate:
-                # Convert result to string and strictly limit its length
-                content_str = str(item.result)
-                if len(content_str) > 2000:
-                    content_str = content_str[:2000] + "...[truncated]"
-                result_blobs.append(f"Step {item.step.id} ({item.step.description}) => {content_str}")
-
-            result_blob = "\n".join(result_blobs)
-            
-            # Final safety check: Ensure total prompt size is within reasonable limits (e.g. ~25k chars)
-            if len(result_blob) > 25000:
-                result_blob = result_blob[:25000] + "\n[...Total output truncated due to length safety...]"
-
-            merged_summary = await llm_provider.complete(
-                "Combine the following agent execution outputs into a concise report:\n" + result_blob
+    async def stream(self, req: ExecuteRequest) -> AsyncIterator[tuple[str, Any]]:
+        """Same run as :meth:`execute`, yielding ``(event, payload)`` pairs as soon as each part is ready.
+
+        Events are ``plan``, one ``step`` per finished tool call (in completion order),
+        ``summary`` for every chunk of the final report and a closing ``done`` carrying the
+        full :class:`ExecuteResponse`.
+        """
+        started = time.perf_counter()
+        with (
+            tracing.span("agent.execute", goal=req.plan_request.goal, streaming=True) as run_span,
+            runs_in_flight.track(mode="stream"),
+            deadline.deadline_scope(req.deadline or settings.RUN_DEADLINE_SECONDS),
+        ):
+            plan_resp = await self._plan(req)
+            use_cache = not req.plan_request.bypass_cache
+            yield "plan", plan_resp
+
+            tasks = self._schedule_steps(plan_resp.steps, req)
+            try:
+                for next_done in asyncio.as_completed(tasks.values()):
+                    result, entry = await next_done
+                    yield "step", {"result": result, "timeline": entry}
+            finally:
+                # The client may disconnect mid-run; do not leave tools running for nobody.
+                for task in tasks.values():
+                    task.cancel()
+
+            outcomes = [task.result() for task in tasks.values()]
+            intermediate = [result for result, _ in outcomes]
+            timeline = [entry for _, entry in outcomes]
+            chunks: list[str] = []
+            cut_short = False
+            context = await self._pack(req.plan_request.goal, intermediate)
+            synthesis = llm_provider.stream(
+                self._synthesis_prompt(req.plan_request.goal, context), use_cache=use_cache, tier="heavy"
             )
+            # Includes the time the consumer takes between chunks.
+            with tracing.span("agent.synthesis", streaming=True) as synthesis_span, synthesis_duration.time():
+                async with aclosing(synthesis) as deltas:
+                    while True:
+                        # Timed per chunk rather than around the loop, so time spent by the
+                        # consumer between events is not cancelled by the run's deadline.
+                        try:
+                            async with asyncio.timeout(self._time_left()):
+                                chunk = await anext(deltas)
+                        except StopAsyncIteration:
+                            break
+                        except TimeoutError:
+                            cut_short = True
+                            break
+                        except StreamInterrupted as exc:
+                            # The report so far stays, flagged partial like a deadline cut.
+                            logger.warning(f"Synthesis stream cut short: {exc}")
+                            cut_short = True
+                            break
+                        chunks.append(chunk)
+                        yield "summary", chunk
+                tracing.set_attributes(synthesis_span, cut_short=cut_short, chunks=len(chunks))
+            if cut_short and not chunks:
+                chunk = self._unsynthesized(context)
+                chunks.append(chunk)
+                yield "summary", chunk
 
-            return ExecuteResponse(
+            response = ExecuteResponse(
+                run_id=uuid.uuid4().hex,
                 plan=plan_resp.plan,
                 intermediate=intermediate,
-                final_summary=merged_summary,
+                final_summary="".join(chunks),
                 timeline=timeline,
+                partial=cut_short or any(entry.status in ("timeout", "skipped") for entry in timeline),
             )
-        except Exception as executor_error:
-            logger.error(f"Executor failed: {executor_error}")
-            raise executor_error
+            tracing.set_attributes(run_span, run_id=response.run_id, partial=response.partial)
+        await self._record_run(response)
+        run_duration.observe(time.perf_counter() - started, mode="stream", partial=str(response.partial).lower())
+        yield "done", response
+
+    async def _plan(self, req: ExecuteRequest) -> PlanResponse:
+        with tracing.span("agent.plan", max_steps=req.plan_request.max_steps) as plan_span, plan_duration.time():
+            plan = await planner.create_plan(req.plan_request, summarize=False)
+            tracing.set_attributes(plan_span, steps=len(plan.steps))
+            return plan
+
+    async def _record_run(self, response: ExecuteResponse) -> None:
+        try:
+            await run_store.save(response.run_id, response.model_dump(mode="json"))
+        except Exception as store_error:
+            # Losing the stored copy must not fail a run the client is waiting on.
+            logger.error(f"Failed to store run {response.run_id}: {store_error}")
+
+    def _schedule_steps(self, steps: list[PlanStep], req: ExecuteRequest) -> dict[int, asyncio.Task]:
+        # Every step gets its own task that waits on the tasks of the steps it depends on,
+        # so independent steps overlap while the semaphore caps how many tools run at once.
+        run_start = asyncio.get_running_loop().time()
+        semaphore = asyncio.Semaphore(req.max_concurrency or settings.STEP_CONCURRENCY)
+        use_cache = not req.plan_request.bypass_cache
+        # Steps stop early enough to leave the synthesis part of the budget.
+        budget = req.deadline or settings.RUN_DEADLINE_SECONDS
+        reserve = min(settings.SYNTHESIS_RESERVE_SECONDS, budget / 4)
+        tasks: dict[int, asyncio.Task] = {}
+        for step in steps:
+            deps = [tasks[d] for d in step.depends_on if d in tasks]
+            tasks[step.id] = asyncio.create_task(
+                self._run_step(step, deps, semaphore, run_start, use_cache, reserve)
+            )
+        return tasks
+
+    @staticmethod
+    def _time_left() -> float | None:
+        left = deadline.remaining()
+        return None if left is None else max(left, 0.0)
+
+    @staticmethod
+    async def _pack(goal: str, intermediate: list[IntermediateResult]) -> str:
+        # Tool outputs are rendered as compact text and packed into a token budget by relevance,
+        # instead of cutting the repr of each result at a fixed length. Off the loop: large
+        # PDF or page outputs take a while to split, score and deduplicate.
+        return await asyncio.to_thread(pack_context, goal, intermediate)
+
+    def _synthesis_prompt(self, goal: str, context: str) -> str:
+        return (
+            f"Goal: {goal}\n"
+            "Combine the following agent execution outputs into a concise report:\n" + context
+        )
+
+    def _unsynthesized(self, context: str) -> str:
+        # Out of time for the LLM: hand back the packed step outputs so the run is still useful.
+        return (
+            "[partial] The run deadline was reached before the report could be written. "
+            "Collected step outputs:\n\n" + context
+        )
+
+    async def _run_step(
+        self,
+        step: PlanStep,
+        deps: list[asyncio.Task],
+        semaphore: asyncio.Semaphore,
+        run_start: float,
+        use_cache: bool = True,
+        reserve: float = 0.0,
+    ) -> tuple[IntermediateResult, TimelineEntry]:
+        if deps:
+            await asyncio.gather(*deps)
+
+        desc = step.description
+        if step.tool and step.tool in tool_registry:
+            tool_name, args = step.tool, step.args or {tool_registry.get(step.tool).primary_arg: desc}
+        else:
+            tool_name = self.select_tool(desc)
+            args = {tool_registry.get(tool_name).primary_arg: desc}
+        tool = tool_registry.get(tool_name)
+        loop = asyncio.get_running_loop()
+
+        # The tool's own slot is taken before the run-wide one, so steps queued behind a
+        # saturated tool do not hold run slots that other tools could use.
+        async with tool.semaphore, semaphore:
+            with tracing.span("agent.step", step_id=step.id, tool=tool_name) as step_span:
+                start = loop.time()
+                left = deadline.remaining()
+                budget = None if left is None else left - reserve
+                status = "ok"
+
+                result_data = None
+                if budget is not None and budget <= 0:
+                    logger.warning(f"Skipping Step {step.id}: run deadline reached")
+                    status = "skipped"
+                    result_data = {"error": "Skipped: the run's time budget was spent before this step started"}
+                else:
+                    # Derived timeout: the tool's own limit, shortened to what is left of the budget.
+                    timeout = tool.timeout if budget is None else min(tool.timeout, budget)
+                    logger.info(f"Executing Step {step.id}: {desc} | Tool: {tool_name} | Timeout: {timeout:.1f}s")
+
+                    def call():
+                        if tool.hedge:
+                            return hedger.run(f"tool:{tool_name}", lambda: tool.call(args, use_cache=use_cache))
+                        return tool.call(args, use_cache=use_cache)
+
+                    try:
+                        # Concurrent runs asking the same tool the same thing share one call; each
+                        # waits only as long as its own budget allows.
+                        async with asyncio.timeout(timeout):
+                            result_data = await single_flight.do(
+                                tool_name, normalize_input(json.dumps(args, sort_keys=True)), call
+                            )
+                    except TimeoutError:
+                        logger.error(f"Tool {tool_name} timed out after {timeout:.1f}s")
+                        status = "timeout"
+                        result_data = {"error": f"Timed out after {timeout:.1f}s"}
+                    except Exception as tool_error:
+                        logger.error(f"Tool {tool_name} failed: {tool_error}")
+                        # Instead of crashing, record the error so the agent can continue or report it
+                        status = "error"
+                        result_data = {"error": f"Tool execution failed: {str(tool_error)}"}
+
+                end = loop.time()
+                tool_duration.observe(end - start, tool=tool_name, status=status)
+                if status != "skipped":
+                    latency_stats.record("tool", tool_name, end - start)
+                tracing.set_attributes(step_span, status=status)
+
+        entry = TimelineEntry(
+            step_id=step.id,
+            tool=tool_name,
+            duration=end - start,
+            start=start - run_start,
+            end=end - run_start,
+            status=status,
+        )
+        return IntermediateResult(step=step, result=result_data), entry
 
     def select_tool(self, description: str) -> str:
-        d = description.lower()
-        if "github" in d or "repo" in d:
-            return "github_search"
-        if d.startswith("fetch") or d.startswith("open") or d.startswith("visit") or "http" in d:
-            return "web_fetch"
-        if d.endswith(".pdf") or "pdf" in d:
-            return "pdf_extract"
-        if "search" in d or "google" in d or "serp" in d:
-            return "web_search"
-        return "summarize"
+        return tool_registry.select(description)
 
 
 # Export the instance for usage in router.py
-executor = Executor()
\ No newline at end of file
+executor = Executor()
@@ -1,56 +1,183 @@
-from typing import List
+from contextlib import aclosing
+from typing import AsyncIterator, List
 import asyncio
+import json
+import time
 
 import httpx
-from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
 
 from ..config import settings
+from .model_router import Tier, model_router
+from ..services.analytics import latency_stats
+from ..services.deadline import clamp, stop_at_deadline
+from ..services.hedging import hedger
+from ..services.http_pool import http_clients
+from ..services.metrics import count_retry, llm_duration, llm_rotations, llm_tokens
+from ..services.llm_cache import completion_cache, make_key
+from ..services.singleflight import single_flight
+
+
+class StreamInterrupted(Exception):
+    """The upstream failed after part of a streamed completion had been yielded."""
+
+
+def _is_transient(exc: BaseException) -> bool:
+    # 429s are handled by rotating models; retrying the same model only burns backoff time.
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _record_usage(model: str, usage: dict | None) -> None:
+    if usage:
+        llm_tokens.inc(usage.get("prompt_tokens", 0), model=model, direction="in")
+        llm_tokens.inc(usage.get("completion_tokens", 0), model=model, direction="out")
+
+
+def _record_error(model: str, exc: BaseException, elapsed: float) -> None:
+    outcome = f"http_{exc.response.status_code}" if isinstance(exc, httpx.HTTPStatusError) else type(exc).__name__
+    llm_duration.observe(elapsed, provider="groq", model=model, outcome=outcome)
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+        model_router.record_rate_limit(model, exc.response.headers)
+    else:
+        model_router.record_failure(model)
 
 
 class LLMProvider:
     def __init__(self):
         self.groq_key = settings.GROQ_API_KEY
         self.groq_models = settings.GROQ_MODELS
+        self.groq_url = settings.GROQ_BASE_URL.rstrip("/") + "/chat/completions"
         self.hf_key = settings.HF_API_KEY
 
-    async def _groq_request(self, prompt: str, model: str) -> str:
+    async def _groq_request(self, prompt: str, model: str, max_tokens: int = 800, json_mode: bool = False) -> str:
         if not self.groq_key:
             raise RuntimeError("Groq API key not configured")
-        url = "https://api.groq.com/openai/v1/chat/completions"
+        url = self.groq_url
         headers = {"Authorization": f"Bearer {self.groq_key}", "Content-Type": "application/json"}
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 800,
+            "max_tokens": max_tokens,
         }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10)):
-                with attempt:
-                    response = await client.post(url, headers=headers, json=payload)
+        client = http_clients.get_client(url)
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(3) | stop_at_deadline(),
+            wait=wait_exponential(min=1, max=10),
+            retry=retry_if_exception(_is_transient),
+            before_sleep=count_retry("groq"),
+            reraise=True,
+        ):
+            with attempt:
+                started = time.monotonic()
+                try:
+                    response = await client.post(url, headers=headers, json=payload, timeout=clamp(30))
                     response.raise_for_status()
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
+                except Exception as exc:
+                    _record_error(model, exc, time.monotonic() - started)
+                    raise
+                elapsed = time.monotonic() - started
+                model_router.record_success(model, elapsed, response.headers)
+                llm_duration.observe(elapsed, provider="groq", model=model, outcome="ok")
+                latency_stats.record("model", model, elapsed)
+                data = response.json()
+                _record_usage(model, data.get("usage"))
+                return data["choices"][0]["message"]["content"]
+
+    async def _groq_stream(self, prompt: str, model: str, max_tokens: int = 800) -> AsyncIterator[str]:
+        # Lines are only read when the consumer asks for the next delta, so a slow consumer
+        # applies TCP back-pressure, and closing the generator closes the response.
+        if not self.groq_key:
+            raise RuntimeError("Groq API key not configured")
+        url = self.groq_url
+        headers = {"Authorization": f"Bearer {self.groq_key}", "Content-Type": "application/json"}
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+
+        client = http_clients.get_client(url)
+        started = time.monotonic()
+        try:
+            async with client.stream("POST", url, headers=headers, json=payload, timeout=clamp(30)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    # Groq reports usage on the last chunk, under x_groq.
+                    _record_usage(model, event.get("usage") or (event.get("x_groq") or {}).get("usage"))
+                    delta = event["choices"][0].get("delta", {}).get("content") if event.get("choices") else None
+                    if delta:
+                        yield delta
+        except Exception as exc:
+            _record_error(model, exc, time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        model_router.record_success(model, elapsed, response.headers)
+        llm_duration.observe(elapsed, provider="groq", model=model, outcome="ok")
+        latency_stats.record("model", model, elapsed)
 
-    async def _groq_complete(self, prompt: str, preferred_model: str | None = None) -> str:
-        models: List[str] = []
-        if preferred_model:
-            models.append(preferred_model)
-        for m in self.groq_models:
-            if m not in models:
-                models.append(m)
+    def _model_order(self, preferred_model: str | None, tier: Tier | None = None) -> List[str]:
+        models = model_router.order(preferred_model, tier)
+        if not models:
+            raise RuntimeError("All Groq models are rate limited or circuit-open")
+        return models
 
+    async def _groq_stream_rotating(
+        self, prompt: str, preferred_model: str | None = None, max_tokens: int = 800, tier: Tier | None = None
+    ) -> AsyncIterator[str]:
         last_error: Exception | None = None
-        for model_name in models:
+        for model_name in self._model_order(preferred_model, tier):
+            started = False
             try:
-                return await self._groq_request(prompt, model_name)
+                async with aclosing(self._groq_stream(prompt, model_name, max_tokens)) as deltas:
+                    async for delta in deltas:
+                        started = True
+                        yield delta
+                return
+            except Exception as exc:
+                if started:
+                    # Tokens already reached the consumer; switching models would repeat them.
+                    raise
+                # rotate to next model if rate limited or unavailable, as _groq_complete does
+                last_error = exc
+                continue
+
+        if last_error:
+            raise last_error
+        raise RuntimeError("No Groq models available")
+
+    async def _groq_complete(
+        self,
+        prompt: str,
+        preferred_model: str | None = None,
+        max_tokens: int = 800,
+        tier: Tier | None = None,
+        json_mode: bool = False,
+    ) -> str:
+        last_error: Exception | None = None
+        for model_name in self._model_order(preferred_model, tier):
+            try:
+                return await self._groq_request(prompt, model_name, max_tokens, json_mode)
             except httpx.HTTPStatusError as exc:
                 last_error = exc
+                llm_rotations.inc(model=model_name, reason=str(exc.response.status_code))
                 if exc.response.status_code == 429:
                     # rotate to next model if rate limited
                     continue
             except Exception as exc:
                 last_error = exc
+                llm_rotations.inc(model=model_name, reason=type(exc).__name__)
                 continue
 
         if last_error:
@@ -60,21 +187,74 @@ class LLMProvider:
     async def _hf_complete(self, prompt: str, model: str = "gpt2") -> str:
         if not self.hf_key:
             raise RuntimeError("HF API key not configured")
-        url = f"https://api-inference.huggingface.co/models/{model}"
+        url = f"{settings.HF_BASE_URL.rstrip('/')}/{model}"
         headers = {"Authorization": f"Bearer {self.hf_key}"}
-        async with httpx.AsyncClient(timeout=30) as client:
-            async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10)):
-                with attempt:
-                    response = await client.post(url, headers=headers, json={"inputs": prompt})
-                    response.raise_for_status()
-                    data = response.json()
-                    if isinstance(data, list) and data:
-                        return data[0].get("generated_text", "")
-                    return str(data)
+        client = http_clients.get_client(url)
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(3) | stop_at_deadline(),
+            wait=wait_exponential(min=1, max=10),
+            before_sleep=count_retry("huggingface"),
+        ):
+            with attempt:
+                started = time.monotonic()
+                response = await client.post(url, headers=headers, json={"inputs": prompt}, timeout=clamp(30))
+                llm_duration.observe(
+                    time.monotonic() - started, provider="huggingface", model=model, outcome=str(response.status_code)
+                )
+                response.raise_for_status()
+                data = response.json()
+                if isinstance(data, list) and data:
+                    return data[0].get("generated_text", "")
+                return str(data)
+
+    async def complete(
+        self,
+        prompt: str,
+        model: str | None = None,
+        max_tokens: int = 800,
+        use_cache: bool = True,
+        tier: Tier | None = None,
+        fallback: bool = True,
+        json_mode: bool = False,
+    ) -> str | None:
+        """Complete ``prompt``. With ``fallback=False`` returns ``None`` instead of placeholder
+        text when every provider fails, for callers that have a better default of their own.
+        ``json_mode`` asks Groq for a JSON object (other providers return plain text)."""
+        cache_key = make_key(model or tier, prompt, max_tokens) if use_cache else None
+        if cache_key:
+            cached = await completion_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-    async def complete(self, prompt: str, model: str | None = None) -> str:
+        # Identical prompts already in flight (e.g. the same goal from several users) share one call.
         try:
-            return await self._groq_complete(prompt, preferred_model=model)
+            result = await single_flight.do(
+                "llm",
+                cache_key or make_key(model or tier, prompt, max_tokens),
+                lambda: self._provider_complete(prompt, model, max_tokens, tier, json_mode),
+            )
+        except TimeoutError:
+            # This run's deadline passed while it waited on a call shared with other runs.
+            result = None
+        if result is None:
+            # Fallback text is never cached so the next call retries the providers.
+            return await self._fallback(prompt) if fallback else None
+
+        if cache_key:
+            await completion_cache.set(cache_key, result)
+        return result
+
+    async def _provider_complete(
+        self, prompt: str, model: str | None, max_tokens: int, tier: Tier | None = None, json_mode: bool = False
+    ) -> str | None:
+        try:
+            # A completion much slower than usual gets a duplicate; the first answer wins.
+            return await hedger.run(
+                f"llm:{model or tier or 'default'}",
+                lambda: self._groq_complete(
+                    prompt, preferred_model=model, max_tokens=max_tokens, tier=tier, json_mode=json_mode
+                ),
+            )
         except Exception:
             pass
 
@@ -83,8 +263,53 @@ class LLMProvider:
         except Exception:
             pass
 
+        return None
+
+    async def _fallback(self, prompt: str) -> str:
         await asyncio.sleep(0.05)
         return f"[fallback] LLM providers unavailable. Prompt length={len(prompt)}\nPrompt:\n{prompt[:2000]}"
 
+    async def stream(
+        self,
+        prompt: str,
+        model: str | None = None,
+        max_tokens: int = 800,
+        use_cache: bool = True,
+        tier: Tier | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield the completion in chunks as Groq produces them.
+
+        Models are rotated on errors until the first token arrives; a failure after that raises
+        :class:`StreamInterrupted`, and the partial text is not cached. Wrap the generator in
+        ``contextlib.aclosing`` (or call ``aclose``) to stop early and release the connection.
+        """
+        cache_key = make_key(model or tier, prompt, max_tokens) if use_cache else None
+        if cache_key:
+            cached = await completion_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: list[str] = []
+        try:
+            async with aclosing(self._groq_stream_rotating(prompt, model, max_tokens, tier)) as deltas:
+                async for delta in deltas:
+                    chunks.append(delta)
+                    yield delta
+        except Exception as exc:
+            if chunks:
+                # Tokens already reached the consumer; they cannot be repeated, so report the cut.
+                raise StreamInterrupted(f"Completion stream failed after {len(chunks)} chunks: {exc}") from exc
+            # Nothing streamed yet, so the regular completion path (with its fallbacks) can take over.
+            result = await self._provider_complete(prompt, model, max_tokens, tier)
+            if result is None:
+                yield await self._fallback(prompt)
+                return
+            chunks.append(result)
+            yield result
+
+        if cache_key and chunks:
+            await completion_cache.set(cache_key, "".join(chunks))
+
 
 llm_provider = LLMProvider()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Literal, Mapping
+import re
+import time
+
+from ..config import settings
+from ..services.analytics import percentile
+
+Tier = Literal["light", "heavy"]
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Seconds until reset from ``retry-after`` / ``x-ratelimit-reset-*`` values ("7.66s", "2m59.56s", "12")."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+class ModelHealth:
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.throttled_until = 0.0
+        self.rate_limited = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until and now >= self.throttled_until
+
+    def state(self, now: float) -> str:
+        if now < self.open_until:
+            return "open"
+        if self.consecutive_failures >= settings.MODEL_CIRCUIT_FAILURES:
+            return "half_open"
+        return "closed"
+
+
+class ModelRouter:
+    """Chooses which Groq models to try, in what order, from recent latency, errors and rate limits.
+
+    A model is skipped while it is rate limited (until the reset advertised by Groq's
+    ``retry-after`` / ``x-ratelimit-*`` headers) or while its circuit is open after
+    ``MODEL_CIRCUIT_FAILURES`` consecutive failures. Once the cooldown passes the model is
+    tried again; a success closes the circuit, a failure reopens it.
+    """
+
+    def __init__(self, models: list[str] | None = None):
+        self.models = list(models or settings.GROQ_MODELS)
+        self._health: dict[str, ModelHealth] = {}
+
+    def _get(self, model: str) -> ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = ModelHealth(settings.MODEL_STATS_WINDOW)
+        return health
+
+    def order(self, preferred_model: str | None = None, tier: Tier | None = None) -> list[str]:
+        candidates: list[str] = []
+        if preferred_model:
+            candidates.append(preferred_model)
+        if tier == "light":
+            candidates.append(settings.GROQ_LIGHT_MODEL)
+        elif tier == "heavy":
+            candidates.append(settings.GROQ_HEAVY_MODEL)
+        candidates.extend(self.models)
+
+        now = time.monotonic()
+        ordered: list[str] = []
+        for model in candidates:
+            if model not in ordered and self._get(model).available(now):
+                ordered.append(model)
+        return ordered
+
+    def record_success(self, model: str, latency: float, headers: Mapping[str, str] | None = None) -> None:
+        health = self._get(model)
+        health.latencies.append(latency)
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        health.open_until = 0.0
+        if headers is not None and headers.get("x-ratelimit-remaining-requests") == "0":
+            # The quota is spent even though this call succeeded; skip the model until it resets.
+            reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                health.throttled_until = time.monotonic() + reset
+
+    def record_rate_limit(self, model: str, headers: Mapping[str, str] | None = None) -> None:
+        health = self._get(model)
+        health.rate_limited += 1
+        reset = None
+        if headers is not None:
+            reset = parse_reset(headers.get("retry-after")) or max(
+                parse_reset(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+            )
+        health.throttled_until = time.monotonic() + (reset or settings.MODEL_RATE_LIMIT_COOLDOWN)
+
+    def record_failure(self, model: str) -> None:
+        health = self._get(model)
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= settings.MODEL_CIRCUIT_FAILURES:
+            health.open_until = time.monotonic() + settings.MODEL_CIRCUIT_COOLDOWN
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        report: dict[str, Any] = {}
+        for model, health in self._health.items():
+            latencies = list(health.latencies)
+            outcomes = list(health.outcomes)
+            report[model] = {
+                "state": health.state(now),
+                "available": health.available(now),
+                "throttled_for": max(0.0, health.throttled_until - now),
+                "calls": len(outcomes),
+                "error_rate": outcomes.count(False) / len(outcomes) if outcomes else 0.0,
+                "rate_limited": health.rate_limited,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+            }
+        return report
+
+
+model_router = ModelRouter()
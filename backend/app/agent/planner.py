@@ -1,26 +1,186 @@
+import json
+import logging
+import re
+from typing import Any
+
+from ..config import settings
 from ..models.request_models import PlanRequest
 from ..models.response_models import PlanResponse, PlanStep
+from ..services.plan_cache import plan_cache
 from .llm import llm_provider
+from .registry import tool_registry
+
+logger = logging.getLogger("planner")
+
+# Phrases that tie a step to the output of earlier ones.
+_STEP_REF = re.compile(r"\bsteps?\s+(\d+(?:\s*(?:,|and|&)\s*\d+)*)", re.IGNORECASE)
+_PREVIOUS_REF = re.compile(r"\b(previous|prior|preceding|above|earlier)\b", re.IGNORECASE)
+_ALL_REF = re.compile(r"\b(all (?:the )?(?:results|findings|outputs)|combine|compile|aggregate)\b", re.IGNORECASE)
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+PLAN_RULES = (
+    "RULES:\n"
+    "1. Do NOT generate a 'how-to' guide for a human (e.g., never say 'Open a browser').\n"
+    "2. Steps must be specific tool inputs (search queries, URLs to fetch).\n"
+    "3. For GitHub, use specific queries like: 'Search GitHub for "
+    "\"python web framework\" sorted by stars'.\n"
+    "4. For General Info, use: 'Web search for \"latest python frameworks 2024\"'.\n"
+)
 
 
 class Planner:
-    async def create_plan(self, req: PlanRequest) -> PlanResponse:
+    async def create_plan(self, req: PlanRequest, summarize: bool = True) -> PlanResponse:
+        """Plan ``req.goal``. ``summarize=False`` skips the plan summary when the caller
+        (e.g. the executor) does not use it; structured plans get it from the same call anyway."""
+        use_cache = not req.bypass_cache
+        cached = plan_cache.get(req.goal, req.max_steps) if use_cache else None
+        if cached is not None:
+            plan = PlanResponse.model_validate(cached)
+            if summarize and not plan.final_summary:
+                plan.final_summary = await self._summarize(plan.steps, use_cache)
+                plan_cache.put(req.goal, req.max_steps, plan.model_dump())
+            return plan
+
+        plan = await self._plan(req, summarize, use_cache)
+        if plan is None:
+            # No provider answered: run the goal as a single step, and do not cache that.
+            steps = [PlanStep(id=1, description=req.goal)]
+            summary = await self._summarize(steps, use_cache) if summarize else ""
+            return PlanResponse(plan=steps, steps=steps, final_summary=summary)
+        plan_cache.put(req.goal, req.max_steps, plan.model_dump())
+        return plan
+
+    async def _plan(self, req: PlanRequest, summarize: bool, use_cache: bool) -> PlanResponse | None:
+        if settings.PLANNER_MODE == "structured":
+            raw = await llm_provider.complete(
+                self._structured_prompt(req), use_cache=use_cache, fallback=False, json_mode=True
+            )
+            if raw is None:
+                return None
+            parsed = self._parse_structured(raw, req.max_steps)
+            if parsed is not None:
+                steps, summary = parsed
+                if not summary and summarize:
+                    summary = await self._summarize(steps, use_cache)
+                return PlanResponse(plan=steps, steps=steps, final_summary=summary)
+            # Not JSON (e.g. a provider without JSON mode); read it as a numbered list.
+            logger.warning("Structured plan was not valid JSON; parsing it as text")
+        else:
+            raw = await llm_provider.complete(self._text_prompt(req), use_cache=use_cache, fallback=False)
+            if raw is None:
+                return None
+
+        steps = self._parse_text(raw, req)
+        summary = await self._summarize(steps, use_cache) if summarize else ""
+        return PlanResponse(plan=steps, steps=steps, final_summary=summary)
+
+    def _text_prompt(self, req: PlanRequest) -> str:
         # CRITICAL FIX: Enhanced prompt to prevent "instructional" steps.
         # We force the LLM to generate raw search queries or specific actions.
-        prompt = (
+        return (
+            "You are the brain of an autonomous research agent. "
+            "Your task is to create a concrete, mechanical execution plan. "
+            f"Goal: {req.goal}\n\n"
+            + PLAN_RULES
+            + f"Produce up to {req.max_steps} numbered steps."
+        )
+
+    def _structured_prompt(self, req: PlanRequest) -> str:
+        tools = "\n".join(
+            f"- {spec.name}: {spec.description}. Arguments: "
+            + ", ".join(
+                f"{arg} ({schema.get('description', schema.get('type', 'string'))})"
+                for arg, schema in spec.input_schema.get("properties", {}).items()
+            )
+            for spec in (tool_registry.get(name) for name in tool_registry.names())
+        )
+        return (
             "You are the brain of an autonomous research agent. "
             "Your task is to create a concrete, mechanical execution plan. "
             f"Goal: {req.goal}\n\n"
-            "RULES:\n"
-            "1. Do NOT generate a 'how-to' guide for a human (e.g., never say 'Open a browser').\n"
-            "2. Steps must be specific tool inputs (search queries, URLs to fetch).\n"
-            "3. For GitHub, use specific queries like: 'Search GitHub for "
-            "\"python web framework\" sorted by stars'.\n"
-            "4. For General Info, use: 'Web search for \"latest python frameworks 2024\"'.\n"
-            f"Produce up to {req.max_steps} numbered steps."
+            + PLAN_RULES
+            + f"\nAvailable tools:\n{tools}\n\n"
+            f"Produce up to {req.max_steps} steps. Reply with a single JSON object and nothing else:\n"
+            '{"summary": "<one or two sentences describing the plan>", "steps": [{"id": 1, '
+            '"description": "<what the step does>", "tool": "<tool name>", "args": {"<argument>": "<value>"}, '
+            '"depends_on": [<ids of earlier steps whose output this step needs>]}]}'
+        )
+
+    async def _summarize(self, steps: list[PlanStep], use_cache: bool) -> str:
+        formatted_steps = "\n".join(f"{step.id}. {step.description}" for step in steps)
+        return await llm_provider.complete(
+            f"Summarize this plan:\n{formatted_steps}", use_cache=use_cache, tier="light"
         )
-        
-        raw = await llm_provider.complete(prompt)
+
+    def _parse_structured(self, raw: str, max_steps: int) -> tuple[list[PlanStep], str] | None:
+        match = _JSON_OBJECT.search(raw)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("steps"), list):
+            return None
+
+        steps: list[PlanStep] = []
+        new_ids: dict[Any, int] = {}
+        for item in data["steps"]:
+            if len(steps) >= max_steps:
+                break
+            if not isinstance(item, dict):
+                continue
+            description = str(item.get("description") or "").strip()
+            tool, args = self._validate_call(item.get("tool"), item.get("args"), description)
+            if not description:
+                description = next(iter(args.values()), "")
+            if not description:
+                continue
+            step_id = len(steps) + 1
+            # The reply is untrusted: only int/str ids are usable as keys, and a lone
+            # dependency may come as a scalar instead of a list.
+            raw_id = item.get("id", step_id)
+            new_ids[raw_id if isinstance(raw_id, (int, str)) else step_id] = step_id
+            raw_deps = item.get("depends_on")
+            if not isinstance(raw_deps, list):
+                raw_deps = [raw_deps] if isinstance(raw_deps, (int, str)) else []
+            # Steps are renumbered 1..n; references are mapped and must point backwards.
+            deps = {new_ids[dep] for dep in raw_deps if isinstance(dep, (int, str)) and dep in new_ids}
+            deps.update(self._infer_dependencies(step_id, description))
+            steps.append(PlanStep(
+                id=step_id,
+                description=description,
+                depends_on=sorted(d for d in deps if 0 < d < step_id),
+                tool=tool,
+                args=args,
+            ))
+        if not steps:
+            return None
+        summary = data.get("summary")
+        return steps, summary.strip() if isinstance(summary, str) else ""
+
+    def _validate_call(self, tool: Any, args: Any, description: str) -> tuple[str, dict[str, str]]:
+        # Unknown tools fall back to keyword selection; arguments are limited to the tool's
+        # schema, and a missing required argument is filled from the step description.
+        if not isinstance(tool, str) or tool not in tool_registry:
+            tool = tool_registry.select(description)
+        spec = tool_registry.get(tool)
+        properties = spec.input_schema.get("properties", {})
+        if isinstance(args, str):
+            args = {spec.primary_arg: args}
+        elif not isinstance(args, dict):
+            args = {}
+        clean = {
+            name: value if isinstance(value, str) else json.dumps(value)
+            for name, value in args.items()
+            if name in properties and value not in (None, "")
+        }
+        for name in spec.input_schema.get("required", []):
+            if name not in clean and description:
+                clean[name] = description
+        return tool, clean
+
+    def _parse_text(self, raw: str, req: PlanRequest) -> list[PlanStep]:
         lines = [line.strip(" -\t") for line in raw.splitlines() if line.strip()]
         steps: list[PlanStep] = []
         for idx, line in enumerate(lines[: req.max_steps], start=1):
@@ -33,16 +193,23 @@ class Planner:
             for prefix in ["Step:", "Action:", "Command:"]:
                 if content.lower().startswith(prefix.lower()):
                     content = content[len(prefix):].strip()
-            
-            steps.append(PlanStep(id=idx, description=content))
+
+            steps.append(PlanStep(id=idx, description=content, depends_on=self._infer_dependencies(idx, content)))
 
         if not steps:
             steps.append(PlanStep(id=1, description=req.goal))
+        return steps
 
-        formatted_steps = "\n".join(f"{step.id}. {step.description}" for step in steps)
-        final_summary = await llm_provider.complete(f"Summarize this plan:\n{formatted_steps}")
-
-        return PlanResponse(plan=steps, steps=steps, final_summary=final_summary)
+    def _infer_dependencies(self, step_id: int, description: str) -> list[int]:
+        # Only earlier steps may be referenced, which keeps the graph acyclic.
+        deps: set[int] = set()
+        for match in _STEP_REF.finditer(description):
+            deps.update(int(n) for n in re.findall(r"\d+", match.group(1)))
+        if _ALL_REF.search(description):
+            deps.update(range(1, step_id))
+        elif _PREVIOUS_REF.search(description) and step_id > 1:
+            deps.add(step_id - 1)
+        return sorted(d for d in deps if 0 < d < step_id)
 
 
-planner = Planner()
\ No newline at end of file
+planner = Planner()
@@ -1,13 +1,253 @@
-from typing import Dict
+from __future__ import annotations
 
-TOOLS: Dict[str, str] = {
-    "web_fetch": "app.tools.web_fetch",
-    "github_search": "app.tools.github_search",
-    "pdf_extract": "app.tools.pdf_extract",
-    "web_search": "app.tools.web_search",
-    "summarize": "app.tools.summarize",
-}
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Any, Awaitable, Callable, Literal
+import asyncio
+import logging
+import re
+
+from ..config import settings
+
+logger = logging.getLogger("registry")
+
+CostClass = Literal["cheap", "network", "cpu", "llm"]
+
+# Third-party packages register tools under this group; each entry point resolves to a
+# ToolSpec (or a zero-argument callable returning one).
+ENTRY_POINT_GROUP = "agentic_automator.tools"
+
+
+def text_input(arg: str, description: str) -> dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {arg: {"type": "string", "description": description}},
+        "required": [arg],
+    }
+
+
+class ToolSpec:
+    """Declaration of a tool. ``target`` is ``"module:function"`` and is only imported on first call."""
+
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        *,
+        description: str,
+        input_schema: dict[str, Any],
+        concurrency: int = 4,
+        timeout: float = 30.0,
+        cost: CostClass = "network",
+        match: str | None = None,
+        context: tuple[str, ...] = (),
+        shutdown: str | None = None,
+        hedge: bool = False,
+    ):
+        self.name = name
+        self.target = target
+        self.description = description
+        self.input_schema = input_schema
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cost = cost
+        self.match = match  # regex over a step description that selects this tool
+        self.context = context  # run options the executor passes through, e.g. "use_cache"
+        self.shutdown = shutdown  # "module:function" releasing pools, called only if loaded
+        self.hedge = hedge  # idempotent and cheap enough to duplicate when slow
+        self._fn: Callable[..., Awaitable[Any]] | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self.calls = 0
+        self.timeouts = 0
+
+    @property
+    def primary_arg(self) -> str:
+        return self.input_schema["required"][0]
+
+    @property
+    def loaded(self) -> bool:
+        return self._fn is not None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Separate per tool, so a backlog of slow PDF parses cannot take every step slot.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def load(self) -> Callable[..., Awaitable[Any]]:
+        if self._fn is None:
+            module, _, attr = self.target.partition(":")
+            self._fn = getattr(import_module(module), attr)
+        return self._fn
+
+    async def call(self, args: dict[str, Any], **context: Any) -> Any:
+        fn = self.load()
+        kwargs = {**args, **{key: value for key, value in context.items() if key in self.context}}
+        self.calls += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                return await fn(**kwargs)
+        except TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"{self.name} timed out after {self.timeout:g}s") from None
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema,
+            "cost": self.cost,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "hedge": self.hedge,
+            "loaded": self.loaded,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+        }
+
+
+BUILTIN_TOOLS = [
+    ToolSpec(
+        "github_search",
+        "app.tools.github_search:search",
+        description="Search GitHub repositories, most starred first",
+        input_schema=text_input("query", "Repository search keywords"),
+        concurrency=4,
+        timeout=30.0,
+        match=r"github|repo",
+    ),
+    ToolSpec(
+        "web_fetch",
+        "app.tools.web_fetch:fetch",
+        description="Download a web page and extract its main text",
+        input_schema=text_input("query", "Text containing the http(s) URL to fetch"),
+        concurrency=8,
+        timeout=45.0,
+        match=r"^(?:fetch|open|visit)|http",
+        shutdown="app.tools.html_extract:shutdown_pool",
+    ),
+    ToolSpec(
+        "pdf_extract",
+        "app.tools.pdf_extract:extract",
+        description="Extract text from a PDF file or URL",
+        input_schema=text_input("path_or_url", "Local path or http(s) URL of the PDF"),
+        concurrency=2,
+        # Reading and map-reducing up to PDF_SUMMARY_MAX_CHARS takes far longer than a plain extract.
+        timeout=180.0 if settings.PDF_SUMMARIZE else 90.0,
+        cost="cpu",
+        match=r"pdf",
+        shutdown="app.tools.pdf_extract:shutdown_pool",
+    ),
+    ToolSpec(
+        "web_search",
+        "app.tools.web_search:search",
+        description="Search the web (SerpAPI when configured, otherwise DuckDuckGo)",
+        input_schema=text_input("query", "Search query"),
+        concurrency=4,
+        timeout=30.0,
+        match=r"search|google|serp",
+        hedge=True,
+    ),
+    ToolSpec(
+        "summarize",
+        "app.tools.summarize:summarize_text",
+        description="Summarize a piece of text with the light LLM",
+        input_schema=text_input("text", "Text to summarize"),
+        concurrency=4,
+        timeout=60.0,
+        cost="llm",
+        context=("use_cache",),
+    ),
+]
+
+DEFAULT_TOOL = "summarize"
+
+
+class ToolRegistry:
+    def __init__(self, specs: list[ToolSpec] | None = None):
+        self._tools: dict[str, ToolSpec] = {}
+        self._selector: re.Pattern[str] | None = None
+        self._order: dict[str, int] = {}
+        for spec in specs or []:
+            self.register(spec)
+
+    def register(self, spec: ToolSpec) -> None:
+        if spec.name in self._tools:
+            logger.warning(f"Tool {spec.name} registered twice; keeping the latest")
+        self._tools[spec.name] = spec
+        self._selector = None
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        for entry_point in entry_points(group=group):
+            try:
+                spec = entry_point.load()
+                if not isinstance(spec, ToolSpec):
+                    spec = spec()
+                self.register(spec)
+            except Exception as exc:
+                logger.error(f"Could not load tool plugin {entry_point.name}: {exc}")
+
+    def get(self, name: str) -> ToolSpec:
+        try:
+            return self._tools[name]
+        except KeyError:
+            raise KeyError(f"Unknown tool: {name}") from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def names(self) -> list[str]:
+        return list(self._tools)
+
+    def _compile_selector(self) -> re.Pattern[str]:
+        # One alternation over every tool's pattern, scanned once per description;
+        # registration order breaks ties when several tools match.
+        groups = []
+        self._order = {}
+        for index, spec in enumerate(self._tools.values()):
+            if spec.match:
+                group = f"t{index}"
+                self._order[group] = index
+                groups.append(f"(?P<{group}>{spec.match})")
+        return re.compile("|".join(groups) or r"(?!)", re.IGNORECASE)
+
+    def select(self, description: str) -> str:
+        if self._selector is None:
+            self._selector = self._compile_selector()
+        best: int | None = None
+        for match in self._selector.finditer(description):
+            index = next(i for group, i in self._order.items() if match.group(group) is not None)
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        if best is None:
+            return DEFAULT_TOOL
+        return list(self._tools)[best]
+
+    def describe(self) -> list[dict[str, Any]]:
+        return [spec.describe() for spec in self._tools.values()]
+
+    def preload(self) -> None:
+        # Import every tool and build the selector now rather than on first use, e.g. in the
+        # app.serve parent so forked workers share them.
+        for spec in self._tools.values():
+            spec.load()
+        if self._selector is None:
+            self._selector = self._compile_selector()
+
+    def shutdown(self) -> None:
+        for spec in self._tools.values():
+            if spec.loaded and spec.shutdown:
+                module, _, attr = spec.shutdown.partition(":")
+                getattr(import_module(module), attr)()
+
+
+tool_registry = ToolRegistry(BUILTIN_TOOLS)
+if settings.TOOL_PLUGINS_ENABLED:
+    tool_registry.load_entry_points()
 
 
 def list_tools():
-    return list(TOOLS.keys())
+    return tool_registry.names()
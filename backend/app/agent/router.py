@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+import json
+from contextlib import aclosing
+
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi import status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 from ..models.request_models import PlanRequest, ExecuteRequest
-from ..models.response_models import PlanResponse, ExecuteResponse
+from ..models.response_models import PlanResponse, ExecuteResponse, JobStatus
 from .planner import planner
 from .executor import executor
+from .registry import tool_registry
+from ..services.datastore import run_store
+from ..services.job_queue import Priority, QueueFullError, TERMINAL, job_queue
 
 router = APIRouter()
 
@@ -16,9 +25,112 @@ async def create_plan(req: PlanRequest):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@router.post("/execute", response_model=ExecuteResponse)
-async def execute(req: ExecuteRequest):
+@router.get("/tools")
+async def list_tools():
+    return tool_registry.describe()
+
+
+@router.post("/execute", response_model=ExecuteResponse, responses={202: {"model": JobStatus}})
+async def execute(
+    req: ExecuteRequest,
+    request: Request,
+    run_async: bool = Query(False, alias="async", description="Queue the run and return a job id immediately"),
+    priority: Priority = Query("normal", description="Scheduling priority for queued runs"),
+):
+    if run_async:
+        try:
+            job = await job_queue.submit(req, tenant=_tenant(request), priority=priority)
+        except QueueFullError as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        return JSONResponse(
+            (await _job_status(job.to_dict())).model_dump(mode="json"),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"{request.url.path.rsplit('/', 1)[0]}/jobs/{job.id}"},
+        )
     try:
         return await executor.execute(req)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+def _tenant(request: Request) -> str:
+    # API_AUTH_KEY is one secret shared by every caller, so it says nothing about who is
+    # calling. Callers can name themselves with x-client-id; the rest are grouped by address.
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return "client:" + hashlib.sha256(client_id.encode()).hexdigest()[:16]
+    return "ip:" + (request.client.host if request.client else "anonymous")
+
+
+async def _job_status(job: dict) -> JobStatus:
+    result = await run_store.load(job["run_id"]) if job["run_id"] else None
+    return JobStatus(**job, result=result)
+
+
+async def _get_job(job_id: str) -> dict:
+    # The job may have been queued on another worker; see JobQueue.lookup.
+    job = await job_queue.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return await _job_status(await _get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = await _get_job(job_id)
+
+    async def events():
+        current = job
+        while current is not None:
+            job_status = await _job_status(current)
+            yield _sse("status", job_status)
+            if job_status.status in TERMINAL:
+                return
+            # Re-send periodically as a heartbeat so proxies keep the connection open.
+            await job_queue.wait_for_change(job_id, timeout=15)
+            current = await job_queue.lookup(job_id)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/runs/{run_id}", response_model=ExecuteResponse)
+async def get_run(run_id: str):
+    run = await run_store.load(run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return run
+
+
+def _sse(event: str, payload) -> str:
+    if isinstance(payload, BaseModel):
+        data = payload.model_dump_json()
+    elif isinstance(payload, dict):
+        data = json.dumps({k: v.model_dump(mode="json") if isinstance(v, BaseModel) else v for k, v in payload.items()})
+    else:
+        data = json.dumps(payload)
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.post("/execute/stream")
+async def execute_stream(req: ExecuteRequest):
+    async def events():
+        try:
+            async with aclosing(executor.stream(req)) as run:
+                async for event, payload in run:
+                    yield _sse(event, payload)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop reverse proxies (nginx) from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
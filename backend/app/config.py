@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,16 +8,99 @@ class Settings(BaseSettings):
 
     APP_NAME: str = "Agentic AI Automator"
     GROQ_API_KEY: str | None = None
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
     GROQ_MODELS: list[str] = [
         "llama-3.3-70b-versatile",
         "llama-3.1-8b-instant",
         "gpt-oss-20b",
     ]
+    GROQ_LIGHT_MODEL: str = "llama-3.1-8b-instant"
+    GROQ_HEAVY_MODEL: str = "llama-3.3-70b-versatile"
+    MODEL_STATS_WINDOW: int = 200
+    MODEL_CIRCUIT_FAILURES: int = 3
+    MODEL_CIRCUIT_COOLDOWN: float = 30.0
+    MODEL_RATE_LIMIT_COOLDOWN: float = 10.0
     HF_API_KEY: str | None = None
+    HF_BASE_URL: str = "https://api-inference.huggingface.co/models"
     GITHUB_TOKEN: str | None = None
+    GITHUB_API_URL: str = "https://api.github.com"
+    GITHUB_SHORTEN_QUERIES: bool = True
+    GITHUB_RATE_LIMIT_RESERVE: int = 3
+    GITHUB_MAX_THROTTLE_WAIT: float = 10.0
+    GITHUB_GRAPHQL_BATCH: bool = False
+    GITHUB_BATCH_WINDOW: float = 0.05
+    GITHUB_BATCH_MAX: int = 10
     SERP_API_KEY: str | None = None
+    SERPAPI_URL: str = "https://serpapi.com/search.json"
+    DUCKDUCKGO_URL: str = "https://duckduckgo.com/html/"
     API_AUTH_KEY: str | None = None
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_BACKEND: Literal["memory", "sqlite", "redis"] = "memory"
+    RATE_LIMIT_PATH: str = "ratelimit.sqlite3"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    REDIS_URL: str | None = None
+    STEP_CONCURRENCY: int = 4
+    RUN_DEADLINE_SECONDS: float = 120.0
+    SYNTHESIS_RESERVE_SECONDS: float = 20.0
+    HEDGE_ENABLED: bool = True
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_WINDOW: int = 200
+    SYNTHESIS_CONTEXT_TOKENS: int = 6000
+    PLANNER_MODE: Literal["structured", "text"] = "structured"
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_TTL_SECONDS: float = 3600.0
+    PLAN_CACHE_MAX_ENTRIES: int = 512
+    PLAN_CACHE_SIMILARITY: float = 0.0
+    SINGLE_FLIGHT_ENABLED: bool = True
+    TOOL_PLUGINS_ENABLED: bool = True
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_PER_HOST: int = 10
+    HTTP_SHARED_MAX_CONNECTIONS: int = 100
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_RETRIES: int = 1
+    HTTP2_ENABLED: bool = True
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_BACKEND: Literal["memory", "sqlite"] = "sqlite"
+    HTTP_CACHE_PATH: str = "http_cache.sqlite3"
+    HTTP_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    HTTP_CACHE_MAX_STALE: float = 300.0
+    HTTP_CACHE_SEARCH_TTL: float = 600.0
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    LLM_CACHE_PATH: str = "llm_cache.sqlite3"
+    LLM_CACHE_TTL_SECONDS: float = 3600.0
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    RUN_STORE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    RUN_STORE_PATH: str = "runs.sqlite3"
+    RUN_STORE_MAX_BYTES: int = 64 * 1024 * 1024
+    HTML_ENGINE: Literal["auto", "lxml", "stdlib"] = "auto"
+    HTML_WORKERS: int = 4
+    HTML_MIN_BLOCK_CHARS: int = 25
+    WEB_FETCH_MAX_CHARS: int = 10000
+    WEB_FETCH_MAX_BYTES: int = 2 * 1024 * 1024
+    PDF_WORKERS: int = 0
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_MAX_CHARS: int = 20000
+    PDF_MAX_DOWNLOAD_BYTES: int = 25 * 1024 * 1024
+    PDF_SUMMARIZE: bool = False
+    PDF_SUMMARY_MAX_CHARS: int = 400_000
+    SUMMARY_CHUNK_TOKENS: int = 2000
+    SUMMARY_CONCURRENCY: int = 4
+    JOB_WORKERS: int = 2
+    JOB_QUEUE_MAX_DEPTH: int = 100
+    JOB_RETENTION: int = 1000
+    METRICS_ENABLED: bool = True
+    STATS_WINDOW_SECONDS: float = 300.0
+    STATS_WINDOW_SLOTS: int = 10
+    STATS_RELATIVE_ACCURACY: float = 0.01
+    TRACING_EXPORTER: Literal["none", "console", "file", "otlp"] = "none"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 1
+    SHUTDOWN_GRACE_SECONDS: float = 25.0
     CORS_ORIGINS: list[str] = ["*"]
     LOG_LEVEL: str = "INFO"
 
@@ -1,4 +1,6 @@
 import os
+from contextlib import asynccontextmanager
+from typing import Literal
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -6,39 +8,128 @@ load_dotenv()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware import Middleware
-from starlette.requests import Request
-from fastapi.security import APIKeyHeader
 
 from .config import settings
 from .agent.router import router as agent_router
 from .utils.logger import get_logger
 from .middleware.rate_limit import RateLimitMiddleware
 from .middleware.auth import APIKeyAuthMiddleware
+from .middleware.timing import RequestTimingMiddleware
 from .utils.error_handler import register_exception_handlers
+from .services.http_cache import http_cache
+from .services.http_pool import http_clients
+from .services.llm_cache import completion_cache
+from .services.plan_cache import plan_cache
+from .services.singleflight import single_flight
+from .services.hedging import hedger
+from .services.analytics import latency_stats
+from .services.metrics import metrics
+from .services.datastore import run_store
+from .services import deadline, tracing
+from .agent.model_router import model_router
+from .services.job_queue import job_queue
+from .agent.registry import tool_registry
 
 logger = get_logger()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process. Anything holding a socket, thread, file or event loop is
+    # opened here or lazily on first use, never at import, so app.serve can fork after import.
+    deadline.end_drain()  # an app started again in the same process (tests) runs normally
+    tracing.configure()
+    job_queue.start()
+    yield
+    # Runs cut to the grace period hand back partial results; queued jobs are cancelled.
+    deadline.begin_drain(settings.SHUTDOWN_GRACE_SECONDS)
+    await job_queue.stop(timeout=settings.SHUTDOWN_GRACE_SECONDS)
+    await http_clients.aclose()
+    tool_registry.shutdown()
+    http_cache.store.close()
+    completion_cache.backend.close()
+    run_store.close()
+    if job_queue.store is not None:
+        job_queue.store.close()
+    tracing.shutdown()
+
+
+# All middleware is plain ASGI (no BaseHTTPMiddleware), so requests are not wrapped in extra
+# tasks/memory streams and streaming responses pass straight through. Listed outermost first.
 middleware = [
-    Middleware(CORSMiddleware, allow_origins=settings.CORS_ORIGINS, allow_methods=["*"], allow_headers=["*"]),
+    Middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"],
+    ),
+    Middleware(RequestTimingMiddleware),
     Middleware(RateLimitMiddleware, max_requests=settings.RATE_LIMIT_PER_MINUTE),
+    Middleware(APIKeyAuthMiddleware, api_key=settings.API_AUTH_KEY),
 ]
 
-app = FastAPI(title=settings.APP_NAME, middleware=middleware)
+app = FastAPI(title=settings.APP_NAME, middleware=middleware, lifespan=lifespan)
 
 app.include_router(agent_router, prefix="/api/v1/agent")
 
-api_key_header = APIKeyHeader(name="Authorization")
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/api/v1/health")
 async def health():
     return JSONResponse({"status": "ok", "app": settings.APP_NAME})
 
 
-@app.middleware("http")
-async def api_key_auth_middleware(request: Request, call_next):
-    response = await call_next(request)
-    return response
+@app.get("/api/v1/stats")
+async def latency_percentiles(kind: Literal["tool", "model", "endpoint"] | None = None):
+    # p50/p95/p99 over the last STATS_WINDOW_SECONDS ("window") and since start ("total").
+    return JSONResponse(latency_stats.snapshot(kind))
+
+
+@app.get("/api/v1/health/http-pools")
+async def http_pool_stats():
+    return JSONResponse(http_clients.stats())
+
+
+@app.get("/api/v1/health/http-cache")
+async def http_cache_stats():
+    return JSONResponse(http_cache.stats())
+
+
+@app.get("/api/v1/health/llm-cache")
+async def llm_cache_stats():
+    return JSONResponse(completion_cache.stats())
+
+
+@app.get("/api/v1/health/plan-cache")
+async def plan_cache_stats():
+    return JSONResponse(plan_cache.stats())
+
+
+@app.get("/api/v1/health/single-flight")
+async def single_flight_stats():
+    return JSONResponse(single_flight.stats())
+
+
+@app.get("/api/v1/health/hedging")
+async def hedging_stats():
+    return JSONResponse(hedger.stats())
+
+
+@app.get("/api/v1/health/models")
+async def model_stats():
+    return JSONResponse(model_router.stats())
+
+
+@app.get("/api/v1/health/jobs")
+async def job_stats():
+    return JSONResponse(job_queue.stats())
 
 register_exception_handlers(app)
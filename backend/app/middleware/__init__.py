@@ -1,3 +1,3 @@
 """Middleware package."""
 
-__all__ = ["auth", "rate_limit"]
+__all__ = ["auth", "rate_limit", "timing"]
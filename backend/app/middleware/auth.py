@@ -1,17 +1,26 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from typing import Iterable
+import hmac
+
+from starlette.datastructures import Headers
 from starlette.responses import Response
 from starlette.status import HTTP_401_UNAUTHORIZED
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# The liveness check and API docs stay reachable without a key. Matched exactly: the
+# /api/v1/health/* diagnostics (pool origins, jobs, caches) stay behind the key.
+PUBLIC_PATHS = frozenset({"/api/v1/health", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"})
 
 
-class APIKeyAuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, api_key: str | None = None):
-        super().__init__(app)
+class APIKeyAuthMiddleware:
+    def __init__(self, app: ASGIApp, api_key: str | None = None, public_paths: Iterable[str] = PUBLIC_PATHS):
+        self.app = app
         self.api_key = api_key
+        self.public_paths = frozenset(public_paths)
 
-    async def dispatch(self, request: Request, call_next):
-        if self.api_key:
-            header = request.headers.get("x-api-key")
-            if header != self.api_key:
-                return Response("Unauthorized", HTTP_401_UNAUTHORIZED)
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.api_key and scope["type"] == "http" and scope["path"] not in self.public_paths:
+            header = Headers(scope=scope).get("x-api-key", "")
+            if not hmac.compare_digest(header.encode(), self.api_key.encode()):
+                await Response("Unauthorized", HTTP_401_UNAUTHORIZED)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
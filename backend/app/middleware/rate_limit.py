@@ -1,26 +1,58 @@
 from __future__ import annotations
 
-import time
-from typing import Callable
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import logging
+import math
+from typing import Any
+from starlette.datastructures import MutableHeaders
 from starlette.responses import Response
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from ..services.rate_limiter import RateLimiter, RateLimitResult, build_backend
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_requests: int = 60, window_seconds: int = 60):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self._bucket: dict[str, list[float]] = {}
-
-    async def dispatch(self, request: Request, call_next: Callable):
-        client_ip = request.client.host if request.client else "anonymous"
-        now = time.time()
-        bucket = self._bucket.setdefault(client_ip, [])
-        bucket[:] = [ts for ts in bucket if now - ts < self.window_seconds]
-        if len(bucket) >= self.max_requests:
-            return Response("Too Many Requests", HTTP_429_TOO_MANY_REQUESTS)
-        bucket.append(now)
-        return await call_next(request)
+logger = logging.getLogger("rate_limit")
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict[str, str]:
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_after)),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(math.ceil(result.retry_after))
+    return headers
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_requests: int = 60, window_seconds: int = 60, backend: Any | None = None):
+        self.app = app
+        self.limiter = RateLimiter(backend or build_backend(), max_requests, window_seconds)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "anonymous"
+        try:
+            result = await self.limiter.hit(client_ip)
+        except Exception as exc:
+            # Fail open: an unreachable shared store must not take the API down with it.
+            logger.error(f"Rate limiter unavailable: {exc}")
+            await self.app(scope, receive, send)
+            return
+
+        headers = rate_limit_headers(result)
+        if not result.allowed:
+            response = Response("Too Many Requests", HTTP_429_TOO_MANY_REQUESTS, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
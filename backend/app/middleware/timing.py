@@ -0,0 +1,38 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.analytics import latency_stats
+
+
+class RequestTimingMiddleware:
+    """Adds ``Server-Timing`` / ``X-Process-Time`` headers measured up to the start of the response.
+
+    For streaming endpoints this is the time to first byte, not the length of the stream.
+    The same time is recorded per route template (``POST /api/v1/agent/execute``) for
+    ``/api/v1/stats``; requests that match no route are pooled under ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"app;dur={elapsed * 1000:.2f}")
+                headers["X-Process-Time"] = f"{elapsed:.6f}"
+                # The router has stored the matched route in the shared scope by now.
+                route = getattr(scope.get("route"), "path", "unmatched")
+                latency_stats.record("endpoint", f"{scope['method']} {route}", elapsed)
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
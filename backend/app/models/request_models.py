@@ -6,9 +6,16 @@ class PlanRequest(BaseModel):
 
     goal: str = Field(..., description="Natural language goal")
     max_steps: int = Field(5, ge=1, le=20, description="Maximum steps to decompose into")
+    bypass_cache: bool = Field(False, description="Skip the plan cache and the LLM completion cache for this request")
 
 
 class ExecuteRequest(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
     plan_request: PlanRequest
+    max_concurrency: int | None = Field(
+        None, ge=1, le=20, description="Maximum steps run concurrently; defaults to STEP_CONCURRENCY"
+    )
+    deadline: float | None = Field(
+        None, gt=0, le=900, description="Seconds the whole run may take; defaults to RUN_DEADLINE_SECONDS"
+    )
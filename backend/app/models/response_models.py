@@ -1,6 +1,6 @@
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PlanStep(BaseModel):
@@ -8,6 +8,9 @@ class PlanStep(BaseModel):
 
     id: int
     description: str
+    depends_on: list[int] = Field(default_factory=list, description="Ids of earlier steps this step waits on")
+    tool: str | None = Field(None, description="Tool chosen by the planner; selected from the description when absent")
+    args: dict[str, str] = Field(default_factory=dict, description="Arguments for the tool, checked against its schema")
 
 
 class IntermediateResult(BaseModel):
@@ -23,6 +26,11 @@ class TimelineEntry(BaseModel):
     step_id: int
     tool: str
     duration: float
+    start: float = Field(0.0, description="Seconds since the run started when the step began")
+    end: float = Field(0.0, description="Seconds since the run started when the step finished")
+    status: Literal["ok", "error", "timeout", "skipped"] = Field(
+        "ok", description="timeout: cut off by its step timeout; skipped: the run's budget was spent before it started"
+    )
 
 
 class PlanResponse(BaseModel):
@@ -36,7 +44,25 @@ class PlanResponse(BaseModel):
 class ExecuteResponse(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
+    run_id: str | None = Field(None, description="Id for retrieving this run from /api/v1/agent/runs/{run_id}")
     plan: list[PlanStep]
     intermediate: list[IntermediateResult]
     final_summary: str
     timeline: list[TimelineEntry]
+    partial: bool = Field(False, description="Some steps or the synthesis were cut short by the run deadline")
+
+
+class JobStatus(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    priority: Literal["high", "normal", "low"]
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    wait_time: float | None = Field(None, description="Seconds spent queued (so far, while still queued)")
+    run_time: float | None = Field(None, description="Seconds spent running (so far, while still running)")
+    run_id: str | None = None
+    error: str | None = None
+    result: ExecuteResponse | None = None
@@ -0,0 +1,168 @@
+"""Pre-fork server: ``python -m app.serve`` runs ``WEB_CONCURRENCY`` uvicorn workers on one socket.
+
+The app, every tool module, the tool selector and the tokenizer are loaded once in this
+process and the workers are forked from it, so they share those pages copy-on-write
+instead of each importing its own copy (``uvicorn --workers`` spawns fresh interpreters).
+Everything holding a socket, thread, file or event loop is opened per worker, in the
+lifespan or on first use.
+
+SIGTERM or SIGINT drains the workers: they stop accepting connections, in-flight runs are
+cut to ``SHUTDOWN_GRACE_SECONDS`` and answer with what they have, then the lifespan closes
+the pools. A second signal kills them. Workers that die are replaced.
+"""
+from __future__ import annotations
+
+import gc
+import math
+import os
+import signal
+import socket
+import time
+from types import FrameType
+from typing import Any
+
+import uvicorn
+
+from .config import settings
+from .services import deadline
+from .utils.logger import get_logger
+
+logger = get_logger("serve")
+
+# A worker that exits sooner than this after starting is replaced only after this pause,
+# so one that cannot start does not spin.
+MIN_UPTIME = 5.0
+DRAIN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # Cores this process may run on, which respects container CPU sets unlike os.cpu_count().
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def preload() -> Any:
+    from .main import app
+    from .agent.context_packer import count_tokens
+    from .agent.registry import tool_registry
+
+    tool_registry.preload()
+    count_tokens("")  # loads the tiktoken encoding
+    # Keep what is loaded so far out of the collector's sight: collections in the workers
+    # would otherwise write to these objects and un-share their pages.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        # uvicorn waits for open requests before shutting down; capping the runs behind them
+        # makes that wait end in (partial) responses instead of cancelled requests.
+        deadline.begin_drain(settings.SHUTDOWN_GRACE_SECONDS)
+        super().handle_exit(sig, frame)
+
+
+def build_config(app: Any) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=settings.HOST,
+        port=settings.PORT,
+        log_level=settings.LOG_LEVEL.lower(),
+        # A few seconds past the drain, for runs cut at it to send their responses.
+        timeout_graceful_shutdown=math.ceil(settings.SHUTDOWN_GRACE_SECONDS) + 5,
+    )
+
+
+def _warn_per_process_state(workers: int) -> None:
+    per_process = [
+        name
+        for name, backend in (
+            ("RUN_STORE_BACKEND", settings.RUN_STORE_BACKEND),
+            ("RATE_LIMIT_BACKEND", settings.RATE_LIMIT_BACKEND),
+        )
+        if backend == "memory"
+    ]
+    if per_process:
+        logger.warning(
+            f"{workers} workers with {' and '.join(per_process)}=memory: runs and jobs are only visible to the "
+            "worker that ran them and each worker enforces its own rate limit; use sqlite to share them"
+        )
+
+
+def _run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+    # Own process group, so a terminal's Ctrl+C reaches only the parent, which sends a single
+    # SIGTERM; a second signal would make uvicorn skip the drain.
+    os.setpgid(0, 0)
+    DrainingServer(config).run(sockets=[sock])
+
+
+def _supervise(config: uvicorn.Config, sock: socket.socket, workers: int) -> None:
+    children: dict[int, float] = {}
+    signals = 0
+
+    def spawn() -> None:
+        # Blocked across fork(), so the parent's handler can never run in the child.
+        signal.pthread_sigmask(signal.SIG_BLOCK, DRAIN_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            for sig in DRAIN_SIGNALS:
+                signal.signal(sig, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, DRAIN_SIGNALS)
+            code = 0
+            try:
+                _run_worker(config, sock)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, DRAIN_SIGNALS)
+
+    def on_signal(sig: int, frame: FrameType | None) -> None:
+        nonlocal signals
+        signals += 1
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM if signals == 1 else signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    for sig in DRAIN_SIGNALS:
+        signal.signal(sig, on_signal)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} workers on {settings.HOST}:{settings.PORT}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or signals:
+            continue
+        logger.error(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}; starting a replacement")
+        if time.monotonic() - started < MIN_UPTIME:
+            time.sleep(MIN_UPTIME)
+        if not signals:
+            spawn()
+    sock.close()
+
+
+def serve(workers: int | None = None) -> None:
+    workers = workers or worker_count()
+    config = build_config(preload())
+    if workers == 1 or not hasattr(os, "fork"):
+        DrainingServer(config).run()
+        return
+    _warn_per_process_state(workers)
+    _supervise(config, config.bind_socket(), workers)
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,8 +1,190 @@
-from typing import Any
+from collections import deque
+from typing import Any, Iterable
+import math
 import statistics
+import time
+
+from ..config import settings
 
 
 def simple_stats(durations: list[float]) -> dict[str, Any]:
     if not durations:
         return {"count": 0}
     return {"count": len(durations), "mean": statistics.mean(durations), "max": max(durations), "min": min(durations)}
+
+
+def percentile(samples: list[float], pct: float) -> float | None:
+    # Nearest-rank percentile over a (small) window of raw samples.
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def window_stats(samples: list[float]) -> dict[str, Any]:
+    stats = simple_stats(samples)
+    if samples:
+        stats.update(p50=percentile(samples, 50), p95=percentile(samples, 95))
+    return stats
+
+
+class QuantileSketch:
+    """Constant-memory quantile estimator (DDSketch-style log buckets).
+
+    Every value is counted in the bucket ``ceil(log_gamma(value))``, so any quantile is
+    returned within ``relative_accuracy`` of the true sample value (1% by default) whatever
+    the distribution. Latencies from a microsecond to an hour fit in about a thousand
+    buckets; beyond ``max_buckets`` the lowest ones are merged, which only costs accuracy
+    at the fast end. Sketches over disjoint samples merge exactly.
+    """
+
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.MIN_VALUE:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, qs: Iterable[float]) -> list[float | None]:
+        if not self.count:
+            return [None for _ in qs]
+        ordered = sorted(self.buckets.items())
+        results: list[float | None] = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.zeros:
+                results.append(max(self.min, 0.0))
+                continue
+            cumulative = self.zeros
+            value = self.max
+            for index, count in ordered:
+                cumulative += count
+                if cumulative > rank:
+                    # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i].
+                    value = 2 * self.gamma ** index / (self.gamma + 1)
+                    break
+            results.append(min(max(value, self.min), self.max))
+        return results
+
+    def summary(self) -> dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        p50, p95, p99 = self.quantiles((0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+
+
+class RollingSketch:
+    """A lifetime sketch plus one per ``window / slots`` seconds, merged on read for the recent window."""
+
+    def __init__(self, window: float, slots: int, relative_accuracy: float = 0.01):
+        self.slot_seconds = window / slots
+        self.relative_accuracy = relative_accuracy
+        self._slots: deque[tuple[int, QuantileSketch]] = deque(maxlen=slots)
+        self.total = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float, now: float | None = None) -> None:
+        epoch = int((time.monotonic() if now is None else now) // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != epoch:
+            self._slots.append((epoch, QuantileSketch(self.relative_accuracy)))
+        self._slots[-1][1].add(value)
+        self.total.add(value)
+
+    def window(self, now: float | None = None) -> QuantileSketch:
+        oldest = int((time.monotonic() if now is None else now) // self.slot_seconds) - (self._slots.maxlen or 1) + 1
+        merged = QuantileSketch(self.relative_accuracy)
+        for epoch, sketch in self._slots:
+            if epoch >= oldest:
+                merged.merge(sketch)
+        return merged
+
+
+class LatencyStats:
+    """Rolling latency percentiles per tool, model and endpoint, served at ``/api/v1/stats``.
+
+    Memory is fixed per series; names beyond ``max_series`` in one kind are pooled under
+    ``"other"`` so a stream of unusual names cannot grow it.
+    """
+
+    def __init__(self, window: float, slots: int, relative_accuracy: float = 0.01, max_series: int = 256):
+        self.window_seconds = window
+        self.slots = slots
+        self.relative_accuracy = relative_accuracy
+        self.max_series = max_series
+        self._series: dict[str, dict[str, RollingSketch]] = {}
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        series = self._series.setdefault(kind, {})
+        sketch = series.get(name)
+        if sketch is None:
+            if len(series) >= self.max_series:
+                name = "other"
+                sketch = series.get(name)
+            if sketch is None:
+                sketch = series[name] = RollingSketch(self.window_seconds, self.slots, self.relative_accuracy)
+        sketch.add(seconds)
+
+    def snapshot(self, kind: str | None = None) -> dict[str, Any]:
+        now = time.monotonic()
+        kinds = [kind] if kind else sorted(self._series)
+        return {
+            "window_seconds": self.window_seconds,
+            "relative_accuracy": self.relative_accuracy,
+            **{
+                name: {
+                    series: {"window": sketch.window(now).summary(), "total": sketch.total.summary()}
+                    for series, sketch in sorted(self._series.get(name, {}).items())
+                }
+                for name in kinds
+            },
+        }
+
+
+latency_stats = LatencyStats(
+    window=settings.STATS_WINDOW_SECONDS,
+    slots=settings.STATS_WINDOW_SLOTS,
+    relative_accuracy=settings.STATS_RELATIVE_ACCURACY,
+)
@@ -1,13 +1,157 @@
-from typing import Any, Dict
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any
 import asyncio
+import json
+import threading
+import time
+import zlib
+
+from ..config import settings
+from .sqlite_db import SQLiteDB
+
+try:  # optional, smaller and faster than JSON for large tool outputs
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:  # optional, better ratio and speed than zlib
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Values smaller than this are stored uncompressed; compression would not pay for itself.
+COMPRESS_THRESHOLD = 1024
+
+
+def encode(value: Any) -> bytes:
+    """Serialize ``value`` into a self-describing blob: 1 byte format, 1 byte codec, payload."""
+    if msgpack is not None:
+        fmt, payload = b"m", msgpack.packb(value, use_bin_type=True)
+    else:
+        fmt, payload = b"j", json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if len(payload) < COMPRESS_THRESHOLD:
+        return fmt + b"-" + payload
+    if zstandard is not None:
+        return fmt + b"Z" + zstandard.ZstdCompressor(level=3).compress(payload)
+    return fmt + b"z" + zlib.compress(payload, 6)
+
+
+def decode(blob: bytes) -> Any:
+    fmt, codec, payload = blob[:1], blob[1:2], blob[2:]
+    if codec == b"Z":
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed but 'zstandard' is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == b"z":
+        payload = zlib.decompress(payload)
+    if fmt == b"m":
+        if msgpack is None:
+            raise RuntimeError("Stored value is msgpack-encoded but 'msgpack' is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+class MemoryRunStore:
+    """LRU of encoded blobs bounded by total byte size rather than entry count."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+
+    async def save(self, key: str, value: Any) -> None:
+        blob = encode(value)
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._data[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    async def load(self, key: str) -> Any:
+        blob = self._data.get(key)
+        if blob is None:
+            return None
+        self._data.move_to_end(key)
+        return decode(blob)
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteRunStore:
+    """Runs persisted in a WAL-mode SQLite file, readable by every worker on the host.
+
+    ``table`` keeps other records (job snapshots) in the same file apart from the runs, with
+    their own byte budget.
+    """
+
+    def __init__(self, path: str, max_bytes: int, table: str = "runs"):
+        self.max_bytes = max_bytes
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = SQLiteDB(path, (
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL)",
+            f"CREATE INDEX IF NOT EXISTS {table}_created ON {table}(created_at)",
+        ))
+
+    def _save(self, key: str, blob: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            # Drop the oldest runs once the byte budget is exceeded.
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY created_at DESC) AS running FROM {self.table}) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    def _load(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    async def save(self, key: str, value: Any) -> None:
+        blob = encode(value)
+        await asyncio.to_thread(self._save, key, blob)
+
+    async def load(self, key: str) -> Any:
+        blob = await asyncio.to_thread(self._load, key)
+        return decode(blob) if blob is not None else None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return {"backend": "sqlite", "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_store() -> MemoryRunStore | SQLiteRunStore:
+    if settings.RUN_STORE_BACKEND == "sqlite":
+        return SQLiteRunStore(settings.RUN_STORE_PATH, settings.RUN_STORE_MAX_BYTES)
+    return MemoryRunStore(settings.RUN_STORE_MAX_BYTES)
+
 
-# Very small in-memory store for intermediate results and plans
-_STORE: Dict[str, Any] = {}
+run_store = build_store()
 
 
 async def save(key: str, value: Any) -> None:
-    _STORE[key] = value
+    await run_store.save(key, value)
 
 
 async def load(key: str) -> Any:
-    return _STORE.get(key)
+    return await run_store.load(key)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Iterator
+import time
+
+from tenacity.stop import stop_base
+
+# Absolute time.monotonic() by which the current run must finish. Tasks copy the context
+# when created, so steps and the calls they make inherit the deadline of their run.
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+# Process-wide cap on every run, set once the process starts shutting down.
+_drain_at: float | None = None
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """Run the block under a budget of ``seconds``; a nested scope can only shorten it."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def begin_drain(seconds: float) -> None:
+    """Cap current and future runs at ``seconds`` from now, e.g. on SIGTERM.
+
+    Runs cut by the cap skip their remaining steps and return partial results, so a
+    shutdown waiting on in-flight requests ends with responses rather than cancellations.
+    """
+    global _drain_at
+    drain_at = time.monotonic() + seconds
+    _drain_at = drain_at if _drain_at is None else min(_drain_at, drain_at)
+
+
+def end_drain() -> None:
+    global _drain_at
+    _drain_at = None
+
+
+def draining() -> bool:
+    return _drain_at is not None
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget, ``None`` outside any scope (may be negative)."""
+    deadline = _deadline.get()
+    if _drain_at is not None:
+        deadline = _drain_at if deadline is None else min(deadline, _drain_at)
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def detached() -> Context:
+    """Copy of the current context without the run's deadline, for work shared by several runs."""
+    context = copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+def clamp(timeout: float) -> float:
+    # Upstream calls never wait past the run's deadline; httpx wants a positive value.
+    left = remaining()
+    return timeout if left is None else max(min(timeout, left), 0.01)
+
+
+class stop_at_deadline(stop_base):
+    """Tenacity stop condition: no further attempt when the backoff sleep alone would use up the budget."""
+
+    def __call__(self, retry_state) -> bool:
+        left = remaining()
+        return left is not None and left <= retry_state.upcoming_sleep
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+import asyncio
+import time
+
+from ..config import settings
+
+T = TypeVar("T")
+
+
+class _Latencies:
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Hedger:
+    """Hedged requests for idempotent calls with a long latency tail.
+
+    The call starts as usual; if it has not returned after the ``quantile`` latency of
+    recent successful calls in the same namespace, an identical second call is started and
+    whichever succeeds first wins (the other is cancelled). With the default p95 about one
+    call in twenty is duplicated. Nothing is hedged until ``min_samples`` latencies are known.
+    """
+
+    def __init__(
+        self, quantile: float = 0.95, min_samples: int = 20, window: int = 200, min_delay: float = 0.05,
+        enabled: bool = True,
+    ):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.enabled = enabled
+        self._namespaces: dict[str, _Latencies] = {}
+
+    def delay(self, namespace: str) -> float | None:
+        stats = self._namespaces.get(namespace)
+        if not self.enabled or stats is None or len(stats.samples) < self.min_samples:
+            return None
+        return max(stats.quantile(self.quantile), self.min_delay)
+
+    async def run(self, namespace: str, fn: Callable[[], Awaitable[T]]) -> T:
+        stats = self._namespaces.setdefault(namespace, _Latencies(self.window))
+        stats.counters["calls"] += 1
+        delay = self.delay(namespace)
+        started = {asyncio.ensure_future(fn()): time.monotonic()}
+        first = next(iter(started))
+        pending = set(started)
+        error: BaseException | None = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    hedge = asyncio.ensure_future(fn())
+                    started[hedge] = time.monotonic()
+                    pending.add(hedge)
+                    stats.counters["hedged"] += 1
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                errors = [task.exception() for task in done]
+                winner = next((task for task, exc in zip(done, errors) if exc is None), None)
+                if winner is not None:
+                    stats.samples.append(time.monotonic() - started[winner])
+                    if winner is not first:
+                        stats.counters["hedge_wins"] += 1
+                    return winner.result()
+                error = errors[-1]
+            raise error  # every attempt failed
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        namespaces = {}
+        for name, stats in self._namespaces.items():
+            namespaces[name] = {
+                **stats.counters,
+                "samples": len(stats.samples),
+                "hedge_delay": self.delay(name),
+            }
+        return {"enabled": self.enabled, "quantile": self.quantile, "namespaces": namespaces}
+
+
+hedger = Hedger(
+    quantile=settings.HEDGE_QUANTILE,
+    min_samples=settings.HEDGE_MIN_SAMPLES,
+    window=settings.HEDGE_WINDOW,
+    enabled=settings.HEDGE_ENABLED,
+)
@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator
+import asyncio
+import codecs
+import hashlib
+import json
+import threading
+import time
+
+import httpx
+
+from ..config import settings
+from .sqlite_db import SQLiteDB
+
+# Statuses that may be stored without explicit freshness information (RFC 9110 §15.1).
+HEURISTIC_STATUSES = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+# Request headers that select a different representation, so they are part of the cache key.
+KEY_HEADERS = ("accept", "accept-language", "authorization", "x-github-api-version")
+# Headers describing the wire encoding; stored bodies are already decoded.
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+# Heuristic lifetimes from Last-Modified are capped, as RFC 9111 §4.2.2 suggests.
+HEURISTIC_MAX_LIFETIME = 24 * 3600.0
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def _seconds(value: str | None) -> float | None:
+    try:
+        return max(0.0, float(int(value))) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _is_upstream_error(response: httpx.Response) -> bool:
+    if response.status_code in {429, 500, 502, 503, 504}:
+        return True
+    # GitHub signals an exhausted quota with 403 rather than 429.
+    return response.status_code == 403 and response.headers.get("x-ratelimit-remaining") == "0"
+
+
+class CacheEntry:
+    """A stored response plus the timing needed for RFC 9111 age and freshness calculations."""
+
+    def __init__(
+        self,
+        status: int,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        complete: bool,
+        initial_age: float,
+        response_time: float,
+        lifetime: float,
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.complete = complete
+        self.initial_age = initial_age
+        self.response_time = response_time
+        self.lifetime = lifetime
+
+    @classmethod
+    def from_response(
+        cls,
+        response: httpx.Response,
+        body: bytes,
+        complete: bool,
+        request_time: float,
+        response_time: float,
+        heuristic_ttl: float,
+    ) -> "CacheEntry":
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in DROP_HEADERS]
+        entry = cls(response.status_code, headers, body, complete, 0.0, response_time, 0.0)
+        entry._update_timing(request_time, response_time, heuristic_ttl)
+        return entry
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def header(self, name: str) -> str | None:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    def _update_timing(self, request_time: float, response_time: float, heuristic_ttl: float) -> None:
+        # RFC 9111 §4.2.3: the age when received is the larger of the apparent age (from Date)
+        # and the Age header corrected for the request's round trip.
+        date = _http_date(self.header("date")) or response_time
+        apparent_age = max(0.0, response_time - date)
+        corrected_age = (_seconds(self.header("age")) or 0.0) + (response_time - request_time)
+        self.initial_age = max(apparent_age, corrected_age)
+        self.response_time = response_time
+        self.lifetime = self._freshness_lifetime(date, heuristic_ttl)
+
+    def _freshness_lifetime(self, date: float, heuristic_ttl: float) -> float:
+        # RFC 9111 §4.2.1, as a private cache (s-maxage does not apply).
+        cache_control = parse_cache_control(self.header("cache-control"))
+        if "no-cache" in cache_control:
+            return 0.0
+        max_age = _seconds(cache_control.get("max-age")) if "max-age" in cache_control else None
+        if max_age is not None:
+            return max_age
+        expires = self.header("expires")
+        if expires is not None:
+            expires_at = _http_date(expires)
+            return max(0.0, expires_at - date) if expires_at else 0.0
+        if self.status not in HEURISTIC_STATUSES:
+            return 0.0
+        last_modified = _http_date(self.header("last-modified"))
+        if last_modified is not None and last_modified < date:
+            return min(0.1 * (date - last_modified), HEURISTIC_MAX_LIFETIME)
+        return heuristic_ttl
+
+    def current_age(self, now: float) -> float:
+        return self.initial_age + max(0.0, now - self.response_time)
+
+    def is_fresh(self, now: float) -> bool:
+        return self.current_age(now) < self.lifetime
+
+    def may_serve_stale(self, now: float) -> bool:
+        cache_control = parse_cache_control(self.header("cache-control"))
+        if "no-cache" in cache_control or "must-revalidate" in cache_control:
+            return False
+        window = _seconds(cache_control.get("stale-if-error"))  # RFC 5861
+        if window is None:
+            window = settings.HTTP_CACHE_MAX_STALE
+        return self.current_age(now) - self.lifetime <= window
+
+    def validators(self) -> dict[str, str]:
+        validators: dict[str, str] = {}
+        etag = self.header("etag")
+        if etag:
+            validators["if-none-match"] = etag
+        last_modified = self.header("last-modified")
+        if last_modified:
+            validators["if-modified-since"] = last_modified
+        return validators
+
+    def refresh(self, not_modified: httpx.Response, request_time: float, response_time: float, heuristic_ttl: float) -> None:
+        # RFC 9111 §4.3.4: headers in the 304 replace the stored ones.
+        updates = {k.lower(): v for k, v in not_modified.headers.items() if k.lower() not in DROP_HEADERS}
+        self.headers = [(k, v) for k, v in self.headers if k.lower() not in updates] + list(updates.items())
+        self._update_timing(request_time, response_time, heuristic_ttl)
+
+    def to_meta(self) -> str:
+        return json.dumps({
+            "status": self.status,
+            "headers": self.headers,
+            "complete": self.complete,
+            "initial_age": self.initial_age,
+            "response_time": self.response_time,
+            "lifetime": self.lifetime,
+        })
+
+    @classmethod
+    def from_meta(cls, meta: str, body: bytes) -> "CacheEntry":
+        data = json.loads(meta)
+        return cls(
+            data["status"],
+            [tuple(pair) for pair in data["headers"]],
+            body,
+            data["complete"],
+            data["initial_age"],
+            data["response_time"],
+            data["lifetime"],
+        )
+
+
+class MemoryHTTPCacheStore:
+    """LRU of entries bounded by total byte size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+
+    async def get(self, key: str) -> CacheEntry | None:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    async def put(self, key: str, entry: CacheEntry) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._data[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteHTTPCacheStore:
+    """Size-bounded on-disk store; least recently used responses are evicted first."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = SQLiteDB(path, (
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, meta TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "used_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS responses_used ON responses(used_at)",
+        ))
+
+    def _get(self, key: str) -> tuple[str, bytes] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT meta, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def _put(self, key: str, meta: str, body: bytes, size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, meta, body, size, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, meta, body, size, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY used_at DESC) AS running FROM responses) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    async def get(self, key: str) -> CacheEntry | None:
+        row = await asyncio.to_thread(self._get, key)
+        return CacheEntry.from_meta(row[0], row[1]) if row else None
+
+    async def put(self, key: str, entry: CacheEntry) -> None:
+        await asyncio.to_thread(self._put, key, entry.to_meta(), entry.body, entry.size)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"backend": "sqlite", "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedStream:
+    """Streaming view of a live or replayed response that records what the caller reads."""
+
+    def __init__(self, response: httpx.Response, cache_status: str, record: bool):
+        self.response = response
+        self.cache_status = cache_status
+        self.recorded: bytearray | None = bytearray() if record else None
+        self.complete = False
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        return self.response.headers
+
+    def raise_for_status(self) -> None:
+        self.response.raise_for_status()
+
+    async def aiter_bytes(self, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+        async for chunk in self.response.aiter_bytes(chunk_size):
+            if self.recorded is not None:
+                self.recorded += chunk
+            yield chunk
+        self.complete = True
+
+    async def aiter_text(self, chunk_size: int | None = None) -> AsyncIterator[str]:
+        decoder = codecs.getincrementaldecoder(self.response.encoding or "utf-8")(errors="replace")
+        async for chunk in self.aiter_bytes(chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
+
+
+class HTTPCache:
+    """RFC 9111 private cache for tool GET requests.
+
+    Fresh responses are replayed without touching the network. Stale ones are revalidated
+    with ``If-None-Match`` / ``If-Modified-Since``; a 304 refreshes the stored copy (and is
+    free against GitHub's rate limit). When the upstream fails or is rate limited, a stale
+    copy is served for up to ``HTTP_CACHE_MAX_STALE`` seconds unless the origin forbids it.
+    """
+
+    def __init__(self, store: MemoryHTTPCacheStore | SQLiteHTTPCacheStore, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self._counters = {"hits": 0, "revalidated": 0, "stale": 0, "misses": 0, "stores": 0, "uncacheable": 0}
+
+    @staticmethod
+    def _key(request: httpx.Request) -> str:
+        # Hashed so credentials in query strings and headers never reach the disk in clear text.
+        parts = [request.method, str(request.url)]
+        parts.extend(f"{name}:{request.headers.get(name, '')}" for name in KEY_HEADERS)
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _replay(request: httpx.Request, entry: CacheEntry, cache_status: str) -> httpx.Response:
+        response = httpx.Response(entry.status, headers=entry.headers, content=entry.body, request=request)
+        response.extensions["http_cache"] = cache_status
+        return response
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        request: httpx.Request,
+        key: str,
+        stream: bool,
+        accept_partial: bool,
+        heuristic_ttl: float,
+    ) -> tuple[httpx.Response, str, float]:
+        entry = await self.store.get(key)
+        if entry is not None and not entry.complete and not accept_partial:
+            entry = None
+        if entry is not None and entry.is_fresh(time.time()):
+            self._counters["hits"] += 1
+            return self._replay(request, entry, "hit"), "hit", 0.0
+
+        if entry is not None:
+            request.headers.update(entry.validators())
+        request_time = time.time()
+        try:
+            response = await client.send(request, stream=stream)
+        except httpx.TransportError:
+            if entry is not None and entry.may_serve_stale(time.time()):
+                self._counters["stale"] += 1
+                return self._replay(request, entry, "stale"), "stale", request_time
+            raise
+
+        if entry is not None and response.status_code == 304:
+            await response.aclose()
+            entry.refresh(response, request_time, time.time(), heuristic_ttl)
+            await self.store.put(key, entry)
+            self._counters["revalidated"] += 1
+            return self._replay(request, entry, "revalidated"), "revalidated", request_time
+        if entry is not None and _is_upstream_error(response) and entry.may_serve_stale(time.time()):
+            await response.aclose()
+            self._counters["stale"] += 1
+            return self._replay(request, entry, "stale"), "stale", request_time
+
+        self._counters["misses"] += 1
+        response.extensions["http_cache"] = "miss"
+        return response, "miss", request_time
+
+    async def _store(
+        self,
+        key: str,
+        response: httpx.Response,
+        body: bytes,
+        complete: bool,
+        request_time: float,
+        heuristic_ttl: float,
+    ) -> None:
+        cache_control = parse_cache_control(response.headers.get("cache-control"))
+        explicit = "max-age" in cache_control or "expires" in response.headers
+        storable = (
+            (response.status_code in HEURISTIC_STATUSES or explicit)
+            and "no-store" not in cache_control
+            and response.headers.get("vary", "").strip() != "*"
+            and len(body) <= self.store.max_bytes
+        )
+        if storable:
+            entry = CacheEntry.from_response(response, body, complete, request_time, time.time(), heuristic_ttl)
+            # Nothing to gain from an entry that is never fresh and cannot be revalidated.
+            storable = entry.lifetime > 0 or bool(entry.validators())
+        if not storable:
+            self._counters["uncacheable"] += 1
+            return
+        await self.store.put(key, entry)
+        self._counters["stores"] += 1
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        *,
+        params: Any = None,
+        headers: Any = None,
+        timeout: Any = httpx.USE_CLIENT_DEFAULT,
+        heuristic_ttl: float = 0.0,
+    ) -> httpx.Response:
+        """Cached ``client.get``. ``heuristic_ttl`` is the freshness lifetime for responses
+        that carry no explicit expiry, validators or ``no-cache``."""
+        request = client.build_request("GET", url, params=params, headers=headers, timeout=timeout)
+        if not self.enabled:
+            return await client.send(request)
+        key = self._key(request)
+        response, status, request_time = await self._send(client, request, key, False, False, heuristic_ttl)
+        if status == "miss":
+            await self._store(key, response, response.content, True, request_time, heuristic_ttl)
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        *,
+        headers: Any = None,
+        timeout: Any = httpx.USE_CLIENT_DEFAULT,
+        heuristic_ttl: float = 0.0,
+    ) -> AsyncIterator[CachedStream]:
+        """Cached ``client.stream("GET", ...)``.
+
+        Whatever the caller reads is stored, so a reader that stops early (like the HTML
+        extractor once it has enough text) caches a prefix. Such prefixes are only replayed
+        through :meth:`stream`, never through :meth:`get`.
+        """
+        request = client.build_request("GET", url, headers=headers, timeout=timeout)
+        if not self.enabled:
+            response = await client.send(request, stream=True)
+            try:
+                yield CachedStream(response, "bypass", record=False)
+            finally:
+                await response.aclose()
+            return
+
+        key = self._key(request)
+        response, status, request_time = await self._send(client, request, key, True, True, heuristic_ttl)
+        body = CachedStream(response, status, record=status == "miss")
+        try:
+            yield body
+        finally:
+            await response.aclose()
+        if body.recorded:
+            await self._store(key, response, bytes(body.recorded), body.complete, request_time, heuristic_ttl)
+
+    def stats(self) -> dict[str, Any]:
+        counters = self._counters
+        lookups = counters["hits"] + counters["revalidated"] + counters["stale"] + counters["misses"]
+        served = counters["hits"] + counters["revalidated"] + counters["stale"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hit_ratio": served / lookups if lookups else 0.0,
+            **self.store.stats(),
+        }
+
+
+def build_store() -> MemoryHTTPCacheStore | SQLiteHTTPCacheStore:
+    if settings.HTTP_CACHE_BACKEND == "sqlite":
+        return SQLiteHTTPCacheStore(settings.HTTP_CACHE_PATH, settings.HTTP_CACHE_MAX_BYTES)
+    return MemoryHTTPCacheStore(settings.HTTP_CACHE_MAX_BYTES)
+
+
+http_cache = HTTPCache(build_store(), enabled=settings.HTTP_CACHE_ENABLED)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+from urllib.parse import urlsplit
+import importlib.util
+
+import httpx
+
+from ..config import settings
+
+# HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Registry key of the client used for every origin that has no dedicated one.
+SHARED = "shared"
+
+
+def api_origins() -> list[str]:
+    return [
+        settings.GROQ_BASE_URL, settings.HF_BASE_URL, settings.GITHUB_API_URL,
+        settings.SERPAPI_URL, settings.DUCKDUCKGO_URL,
+    ]
+
+
+class HTTPClientRegistry:
+    """Application-lifetime ``httpx.AsyncClient`` instances.
+
+    Tools and LLM providers call :meth:`get_client` instead of opening a client per call,
+    so DNS lookups, TCP/TLS handshakes and keep-alive connections are reused. The known API
+    origins get a pool each; arbitrary pages (``web_fetch``, ``pdf_extract``) share one
+    client, whose pool is still keyed per host, so the registry stays bounded however many
+    sites users fetch.
+    """
+
+    def __init__(self, dedicated: Iterable[str] | None = None) -> None:
+        self.dedicated = {self._origin(url) for url in (api_origins() if dedicated is None else dedicated)}
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._transports: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._requests: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        origin = self._origin(url)
+        if origin not in self.dedicated:
+            origin = SHARED
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = self._create_client(origin)
+            self._clients[origin] = client
+        return client
+
+    def _create_client(self, origin: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=(
+                settings.HTTP_SHARED_MAX_CONNECTIONS if origin == SHARED else settings.HTTP_MAX_CONNECTIONS_PER_HOST
+            ),
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        transport = httpx.AsyncHTTPTransport(
+            limits=limits,
+            http2=settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+            retries=settings.HTTP_CONNECT_RETRIES,
+        )
+        self._transports[origin] = transport
+        self._requests.setdefault(origin, 0)
+        self._errors.setdefault(origin, 0)
+
+        async def _on_request(request: httpx.Request) -> None:
+            self._requests[origin] += 1
+
+        async def _on_response(response: httpx.Response) -> None:
+            if response.status_code >= 400:
+                self._errors[origin] += 1
+
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=settings.HTTP_TIMEOUT,
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+
+    def stats(self) -> dict[str, Any]:
+        pools: dict[str, Any] = {}
+        for origin in self._clients:
+            # httpx does not expose its connection pool publicly; read httpcore's view of it.
+            pool = getattr(self._transports.get(origin), "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            pools[origin] = {
+                "requests": self._requests.get(origin, 0),
+                "error_responses": self._errors.get(origin, 0),
+                "connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle()),
+                "http2_connections": sum(1 for c in connections if "HTTP/2" in repr(c)),
+            }
+        return {
+            "http2_available": HTTP2_AVAILABLE,
+            "http2_enabled": settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+            "max_connections_per_host": settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            "max_keepalive_per_host": settings.HTTP_MAX_KEEPALIVE_PER_HOST,
+            "pools": pools,
+        }
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._transports.clear()
+        for client in clients:
+            await client.aclose()
+
+
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Literal
+import asyncio
+import logging
+import time
+import uuid
+
+from ..config import settings
+from . import deadline
+from .analytics import window_stats
+from .datastore import SQLiteRunStore
+
+logger = logging.getLogger("job_queue")
+
+Priority = Literal["high", "normal", "low"]
+PRIORITIES: tuple[Priority, ...] = ("high", "normal", "low")
+TERMINAL = {"succeeded", "failed", "cancelled"}
+# Job snapshots are kept in their own table of the run store file, so they neither show up as
+# runs nor evict them. A snapshot is a few hundred bytes; other workers poll them this often.
+SNAPSHOT_TABLE = "jobs"
+SNAPSHOT_MAX_BYTES = 8 * 1024 * 1024
+SNAPSHOT_POLL_SECONDS = 1.0
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, request: Any, tenant: str, priority: Priority):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.tenant = tenant
+        self.priority = priority
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.run_id: str | None = None
+        self.error: str | None = None
+        self._changed = asyncio.Event()
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        # Wake everyone waiting on the current event, then arm a fresh one for the next change.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> dict[str, Any]:
+        now = time.time()
+        started = self.started_at or (None if self.status in TERMINAL else now)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait_time": (started - self.created_at) if started else None,
+            "run_time": ((self.finished_at or now) - self.started_at) if self.started_at else None,
+            "run_id": self.run_id,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Bounded pool of workers draining prioritised, per-tenant queues.
+
+    Higher priorities are always served first. Within a priority, tenants (``x-client-id``
+    headers, or client IPs without one) are served round-robin, so one busy client cannot
+    starve the rest.
+
+    Each worker process has its own queue. With a ``store`` shared by the processes, every
+    status change is also saved there, so any worker can answer for a job.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Any], Awaitable[Any]],
+        workers: int,
+        max_depth: int,
+        retention: int,
+        store: Any = None,
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.max_depth = max_depth
+        self.retention = retention
+        self.store = store
+        self._queues: dict[Priority, OrderedDict[str, deque[Job]]] = {p: OrderedDict() for p in PRIORITIES}
+        self._depth = 0
+        self._ready: asyncio.Semaphore | None = None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._tasks: list[asyncio.Task] = []
+        self._running = 0
+        self._idle: asyncio.Event | None = None
+        self._stopping = False
+        self._counters = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0}
+        self._wait_times: deque[float] = deque(maxlen=1000)
+        self._run_times: deque[float] = deque(maxlen=1000)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._ready = asyncio.Semaphore(self._depth)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 0.0) -> None:
+        """Give running jobs ``timeout`` seconds to finish, then cancel them and every queued job."""
+        # From here on workers cancel the queued jobs they pick instead of running them.
+        self._stopping = True
+        if self._running and timeout > 0:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Cancelling {self._running} job(s) still running after {timeout:g}s")
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for tenants in self._queues.values():
+            for jobs in tenants.values():
+                while jobs:
+                    await self._cancel(jobs.popleft())
+            tenants.clear()
+        self._depth = 0
+
+    def _draining(self) -> bool:
+        return self._stopping or deadline.draining()
+
+    async def submit(self, request: Any, tenant: str, priority: Priority = "normal") -> Job:
+        self.start()
+        if self._draining():
+            self._counters["rejected"] += 1
+            raise QueueFullError("Shutting down; not accepting new jobs")
+        if self._depth >= self.max_depth:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Job queue is full ({self.max_depth} queued)")
+        job = Job(request, tenant, priority)
+        self._queues[priority].setdefault(tenant, deque()).append(job)
+        self._depth += 1
+        self._counters["submitted"] += 1
+        self._remember(job)
+        self._ready.release()
+        await self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def lookup(self, job_id: str) -> dict[str, Any] | None:
+        """Status of a job queued on this worker, or on another one when the store is shared."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is None:
+            return None
+        return await self.store.load(job_id)
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            await job.wait_for_change(timeout)
+        else:
+            await asyncio.sleep(min(timeout, SNAPSHOT_POLL_SECONDS))
+
+    async def _publish(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            await self.store.save(job.id, job.to_dict())
+        except Exception as exc:
+            # Other workers see a stale status; the job itself is unaffected.
+            logger.error(f"Failed to publish job {job.id}: {exc}")
+
+    async def _cancel(self, job: Job) -> None:
+        job.finished_at = time.time()
+        job.error = "Cancelled during shutdown"
+        job._set_status("cancelled")
+        await self._publish(job)
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        # Forget the oldest finished jobs; queued and running ones are always kept.
+        if len(self._jobs) > self.retention:
+            for old_id in [j.id for j in self._jobs.values() if j.status in TERMINAL][: len(self._jobs) - self.retention]:
+                del self._jobs[old_id]
+
+    def _next_job(self) -> Job:
+        for priority in PRIORITIES:
+            tenants = self._queues[priority]
+            if not tenants:
+                continue
+            tenant, jobs = next(iter(tenants.items()))
+            job = jobs.popleft()
+            del tenants[tenant]
+            if jobs:
+                # Back of the line for this tenant's next job.
+                tenants[tenant] = jobs
+            self._depth -= 1
+            return job
+        raise RuntimeError("Job queue signalled ready but is empty")
+
+    async def _worker(self) -> None:
+        while True:
+            await self._ready.acquire()
+            job = self._next_job()
+            if self._draining():
+                # Not started yet: a run begun now would be cut short by the drain anyway.
+                await self._cancel(job)
+                continue
+            job.started_at = time.time()
+            self._wait_times.append(job.started_at - job.created_at)
+            self._running += 1
+            self._idle.clear()
+            job._set_status("running")
+            await self._publish(job)
+            try:
+                response = await self.runner(job.request)
+                job.run_id = getattr(response, "run_id", None)
+                job.finished_at = time.time()
+                self._counters["succeeded"] += 1
+                job._set_status("succeeded")
+            except asyncio.CancelledError:
+                await self._cancel(job)
+                raise
+            except Exception as exc:
+                logger.error(f"Job {job.id} failed: {exc}")
+                job.finished_at = time.time()
+                job.error = str(exc)
+                self._counters["failed"] += 1
+                job._set_status("failed")
+            finally:
+                self._running -= 1
+                if not self._running:
+                    self._idle.set()
+                if job.finished_at:
+                    self._run_times.append(job.finished_at - job.started_at)
+            await self._publish(job)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": self._depth,
+            "queue_depth_by_priority": {
+                p: sum(len(jobs) for jobs in self._queues[p].values()) for p in PRIORITIES
+            },
+            "max_depth": self.max_depth,
+            **self._counters,
+            "wait_time": window_stats(list(self._wait_times)),
+            "run_time": window_stats(list(self._run_times)),
+        }
+
+
+def _run_execute(request: Any) -> Awaitable[Any]:
+    # Imported lazily: the executor pulls in every tool module.
+    from ..agent.executor import executor
+
+    return executor.execute(request)
+
+
+job_queue = JobQueue(
+    _run_execute,
+    workers=settings.JOB_WORKERS,
+    max_depth=settings.JOB_QUEUE_MAX_DEPTH,
+    retention=settings.JOB_RETENTION,
+    # Only a store shared by the worker processes is worth a write per status change.
+    store=(
+        SQLiteRunStore(settings.RUN_STORE_PATH, SNAPSHOT_MAX_BYTES, table=SNAPSHOT_TABLE)
+        if settings.RUN_STORE_BACKEND == "sqlite"
+        else None
+    ),
+)
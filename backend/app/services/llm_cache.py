@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any
+import asyncio
+import hashlib
+import threading
+import time
+
+from ..config import settings
+from .sqlite_db import SQLiteDB
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Whitespace differences never change the meaning of a prompt, casing might.
+    return " ".join(prompt.split())
+
+
+def make_key(model: str | None, prompt: str, max_tokens: int) -> str:
+    raw = f"{model or 'auto'}\x00{max_tokens}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend:
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU dict of ``key -> (expires_at, value)`` bounded by entry count."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk cache that survives restarts. Queries run in a worker thread to keep the loop free."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = SQLiteDB(path, (
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS completions_accessed ON completions(accessed_at)",
+        ))
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM completions WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+
+    async def get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CompletionCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        if self.enabled:
+            await self.backend.set(key, value, self.ttl)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_cache() -> CompletionCache:
+    if settings.LLM_CACHE_BACKEND == "sqlite":
+        backend: CacheBackend = SQLiteCacheBackend(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES)
+    else:
+        backend = MemoryCacheBackend(settings.LLM_CACHE_MAX_ENTRIES)
+    return CompletionCache(backend, ttl=settings.LLM_CACHE_TTL_SECONDS, enabled=settings.LLM_CACHE_ENABLED)
+
+
+completion_cache = build_cache()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+import math
+import time
+
+from ..config import settings
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# A collector returns (name, type, help, [(labels, value), ...]) families read at scrape time,
+# for components that already keep their own counters (caches, single-flight).
+Family = tuple[str, str, str, list[tuple[dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then sum and count.
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {count}"
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format at ``/metrics``.
+
+    Values are per worker process; scrape each worker (or aggregate in Prometheus) when
+    running several.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[Family]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], list[Family]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+runs_in_flight = metrics.gauge("agent_runs_in_flight", "Execute runs currently in progress", ("mode",))
+run_duration = metrics.histogram(
+    "agent_run_duration_seconds", "Wall time of execute runs, planning and synthesis included", ("mode", "partial")
+)
+plan_duration = metrics.histogram("agent_plan_duration_seconds", "Time to produce a plan")
+synthesis_duration = metrics.histogram("agent_synthesis_duration_seconds", "Time to write the final report")
+tool_duration = metrics.histogram("agent_tool_duration_seconds", "Plan step latency per tool", ("tool", "status"))
+llm_duration = metrics.histogram(
+    "llm_request_duration_seconds", "Latency of single upstream LLM requests", ("provider", "model", "outcome")
+)
+llm_tokens = metrics.counter("llm_tokens_total", "Tokens reported by the LLM provider", ("model", "direction"))
+llm_rotations = metrics.counter(
+    "llm_model_rotations_total", "Completions moved to the next model after an error", ("model", "reason")
+)
+upstream_retries = metrics.counter("upstream_retries_total", "Retried upstream calls", ("target",))
+
+
+def _cache_families() -> list[Family]:
+    # Imported at scrape time, so importing this module never builds the caches.
+    from .http_cache import http_cache
+    from .llm_cache import completion_cache
+    from .plan_cache import plan_cache
+    from .singleflight import single_flight
+
+    http = http_cache.stats()
+    llm = completion_cache.stats()
+    plan = plan_cache.stats()
+    lookups = [
+        *(({"cache": "http", "result": result}, http[result]) for result in ("hits", "revalidated", "stale", "misses")),
+        ({"cache": "llm", "result": "hits"}, llm["hits"]),
+        ({"cache": "llm", "result": "misses"}, llm["misses"]),
+        *(({"cache": "plan", "result": result}, plan[result]) for result in ("exact_hits", "similar_hits", "misses")),
+    ]
+    flights = [
+        ({"namespace": namespace, "outcome": outcome}, counters[outcome])
+        for namespace, counters in single_flight.stats()["namespaces"].items()
+        for outcome in ("executed", "coalesced")
+    ]
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by cache and result", lookups),
+        ("cache_entries", "gauge", "Entries held per cache", [
+            ({"cache": "http"}, http["entries"]), ({"cache": "llm"}, llm["entries"]), ({"cache": "plan"}, plan["entries"]),
+        ]),
+        ("single_flight_calls_total", "counter", "Calls that ran or joined an identical in-flight call", flights),
+    ]
+
+
+metrics.collector(_cache_families)
+
+
+def count_retry(target: str) -> Callable[[Any], None]:
+    """Tenacity ``before_sleep`` hook counting each retry of ``target``."""
+
+    def before_sleep(retry_state: Any) -> None:
+        upstream_retries.inc(target=target)
+
+    return before_sleep
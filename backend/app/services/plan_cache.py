@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from typing import Any
+import math
+import re
+import time
+
+from ..config import settings
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+# Words that carry no meaning for deciding whether two goals ask for the same plan.
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "in", "on", "me", "my", "please", "with", "about", "some",
+    "find", "show", "give", "list", "get", "i", "want", "need", "can", "you", "what", "are", "is", "top",
+}
+
+
+def normalize_goal(goal: str) -> str:
+    return " ".join(_TOKEN.findall(goal.lower()))
+
+
+def goal_terms(normalized: str) -> Counter[str]:
+    words = [w.rstrip(".") for w in normalized.split() if w not in STOPWORDS]
+    terms = Counter(words)
+    # Bigrams keep some word order, so "python to rust" and "rust to python" are not identical.
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+
+class _Entry:
+    def __init__(self, plan: dict[str, Any], max_steps: int, terms: Counter[str], expires_at: float):
+        self.plan = plan
+        self.max_steps = max_steps
+        self.steps = len(plan.get("steps", []))
+        self.terms = terms
+        self.expires_at = expires_at
+
+
+class PlanCache:
+    """Plans keyed on normalized goal + ``max_steps``, with an optional near-duplicate lookup.
+
+    The similarity index is TF-IDF cosine over goal words and bigrams, computed locally
+    against the cached goals. A cached plan is reused for a similar goal when the score
+    reaches ``similarity`` and the plan fits within the request's ``max_steps``.
+    Entries expire after ``ttl`` seconds; beyond ``max_entries`` the least recently used go.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, similarity: float = 0.0, enabled: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.enabled = enabled
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._postings: dict[str, set[str]] = {}
+        self._counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(normalized: str, max_steps: int) -> str:
+        return f"{max_steps}\x00{normalized}"
+
+    def get(self, goal: str, max_steps: int) -> dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        normalized = normalize_goal(goal)
+        key = self._key(normalized, max_steps)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < now:
+            self._remove(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self._counters["exact_hits"] += 1
+            return entry.plan
+
+        if self.similarity > 0:
+            match = self._most_similar(goal_terms(normalized), max_steps, now)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self._counters["similar_hits"] += 1
+                return self._entries[match].plan
+
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, goal: str, max_steps: int, plan: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        normalized = normalize_goal(goal)
+        key = self._key(normalized, max_steps)
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(plan, max_steps, goal_terms(normalized), time.time() + self.ttl)
+        self._entries[key] = entry
+        for term in entry.terms:
+            self._postings.setdefault(term, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._counters["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for term in entry.terms:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def _idf(self, term: str) -> float:
+        # Smoothed, so a term shared by every cached goal still counts a little.
+        return math.log((1 + len(self._entries)) / (1 + len(self._postings.get(term, ())))) + 1.0
+
+    def _vector(self, terms: Counter[str]) -> dict[str, float]:
+        vector = {term: (1 + math.log(count)) * self._idf(term) for term, count in terms.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def _most_similar(self, terms: Counter[str], max_steps: int, now: float) -> str | None:
+        # Only goals sharing at least one term can score above zero.
+        candidates: set[str] = set()
+        for term in terms:
+            candidates |= self._postings.get(term, set())
+        if not candidates:
+            return None
+        query = self._vector(terms)
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.expires_at < now or entry.steps > max_steps:
+                continue
+            vector = self._vector(entry.terms)
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._postings.clear()
+
+    def stats(self) -> dict[str, Any]:
+        counters = self._counters
+        lookups = counters["exact_hits"] + counters["similar_hits"] + counters["misses"]
+        hits = counters["exact_hits"] + counters["similar_hits"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "similarity_threshold": self.similarity,
+            **counters,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+plan_cache = PlanCache(
+    ttl=settings.PLAN_CACHE_TTL_SECONDS,
+    max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+    similarity=settings.PLAN_CACHE_SIMILARITY,
+    enabled=settings.PLAN_CACHE_ENABLED,
+)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, NamedTuple
+import asyncio
+import math
+import threading
+import time
+
+from ..config import settings
+from .sqlite_db import SQLiteDB
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the bucket is completely full again
+    retry_after: float  # seconds until the next request would be allowed (0 when allowed)
+
+
+def _result(allowed: bool, limit: int, interval: float, window: float, reset_after: float, retry_after: float):
+    # The epsilon absorbs float error, e.g. (1.0 - 0.2) / 0.2 == 3.9999999999999996.
+    remaining = max(0, math.floor((window - reset_after) / interval + 1e-6)) if allowed else 0
+    return RateLimitResult(allowed, limit, remaining, reset_after, retry_after)
+
+
+class MemoryRateLimitBackend:
+    """GCRA state for a single process: one theoretical arrival time (TAT) per key.
+
+    Each hit is O(1). Keys are kept in least-recently-used order so idle keys, whose TAT
+    is already in the past and therefore carry no state, are dropped from the front.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tat: OrderedDict[str, float] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        interval = window / limit
+        now = time.monotonic()
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - window
+        if now < allow_at:
+            return _result(False, limit, interval, window, tat - now, allow_at - now)
+
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        self._evict(now)
+        return _result(True, limit, interval, window, new_tat - now, 0.0)
+
+    def _evict(self, now: float) -> None:
+        while self._tat:
+            key, tat = next(iter(self._tat.items()))
+            if tat > now and len(self._tat) <= self.max_keys:
+                break
+            del self._tat[key]
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class SQLiteRateLimitBackend:
+    """GCRA state shared by the workers on one host through a WAL-mode SQLite file.
+
+    Each hit is one short ``BEGIN IMMEDIATE`` transaction, so workers take turns on the
+    file's write lock and never act on a stale TAT. The wall clock stands in for Redis's
+    server clock; buckets that are full again are purged every ``purge_every`` hits.
+    """
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._conn = SQLiteDB(path, ("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL)",))
+
+    def _hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        interval = window / limit
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tat FROM buckets WHERE key = ?", (key,)).fetchone()
+                tat = max(row[0], now) if row else now
+                new_tat = tat + interval
+                allow_at = new_tat - window
+                if now < allow_at:
+                    result = _result(False, limit, interval, window, tat - now, allow_at - now)
+                else:
+                    self._conn.execute("INSERT OR REPLACE INTO buckets (key, tat) VALUES (?, ?)", (key, new_tat))
+                    self._hits += 1
+                    if self._hits % self.purge_every == 0:
+                        self._conn.execute("DELETE FROM buckets WHERE tat < ?", (now,))
+                    result = _result(True, limit, interval, window, new_tat - now, 0.0)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return result
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        return await asyncio.to_thread(self._hit, key, limit, window)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# GCRA evaluated atomically inside Redis, using the server clock so every worker and node
+# agrees on "now". Floats are returned as strings because Lua numbers are truncated to integers.
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now), '0'}
+"""
+
+
+class RedisRateLimitBackend:
+    """GCRA state shared by all workers through any Redis-protocol server.
+
+    ``client`` is a ``redis.asyncio.Redis`` (or compatible, e.g. ``fakeredis``) instance.
+    Keys expire on their own once the bucket is full again, so nothing needs evicting.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitBackend":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        return cls(redis_asyncio.from_url(url))
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        interval = window / limit
+        allowed, reset_after, retry_after = await self._script(keys=[self.prefix + key], args=[interval, window])
+        return _result(bool(int(allowed)), limit, interval, window, float(reset_after), float(retry_after))
+
+
+class RateLimiter:
+    def __init__(self, backend: Any, limit: int, window: float = 60.0):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+
+    async def hit(self, key: str) -> RateLimitResult:
+        return await self.backend.hit(key, self.limit, self.window)
+
+
+def build_backend() -> Any:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+        return RedisRateLimitBackend.from_url(settings.REDIS_URL)
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(settings.RATE_LIMIT_PATH)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
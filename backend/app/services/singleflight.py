@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, TypeVar
+import asyncio
+
+from ..config import settings
+from . import deadline
+
+T = TypeVar("T")
+
+
+def normalize_input(value: str) -> str:
+    return " ".join(value.split())
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls onto one in-flight task.
+
+    The first caller for a ``(namespace, key)`` starts the call; callers arriving while it
+    runs await the same task. A caller that is cancelled only stops waiting; the shared call
+    is cancelled once no caller is left waiting for it.
+
+    The shared call runs without any run's deadline, since callers with larger budgets may
+    join it; each caller instead stops waiting when its own deadline passes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: dict[tuple[str, str], _Flight] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    async def do(self, namespace: str, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await fn()
+        counters = self._counters.setdefault(namespace, {"calls": 0, "executed": 0, "coalesced": 0})
+        counters["calls"] += 1
+        flight_key = (namespace, key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(fn(), context=deadline.detached()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(flight_key, task))
+            counters["executed"] += 1
+        else:
+            counters["coalesced"] += 1
+
+        flight.waiters += 1
+        left = deadline.remaining()
+        try:
+            async with asyncio.timeout(None if left is None else max(left, 0.0)):
+                return await asyncio.shield(flight.task)
+        finally:
+            # Cancelled, or out of time (asyncio.timeout turns the cancellation into a
+            # TimeoutError): nobody is left for the shared call once the last waiter goes.
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _finish(self, flight_key: tuple[str, str], task: asyncio.Task) -> None:
+        flight = self._flights.get(flight_key)
+        if flight is not None and flight.task is task:
+            del self._flights[flight_key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; every waiter already got it re-raised
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "namespaces": {name: dict(counters) for name, counters in self._counters.items()},
+        }
+
+
+single_flight = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
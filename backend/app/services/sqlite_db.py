@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any
+import os
+import sqlite3
+
+
+class SQLiteDB:
+    """A WAL-mode SQLite file, connected lazily and once per process.
+
+    SQLite connections must not be used across ``fork()``. Stores built at import time in a
+    pre-fork parent (``app.serve``) therefore hold one of these rather than a connection: a
+    worker that finds a connection opened by another process leaves it alone and opens its own.
+    Callers serialize access with their own lock, as they did around a bare connection.
+    """
+
+    def __init__(self, path: str, schema: tuple[str, ...] = ()):
+        self.path = path
+        self.schema = schema
+        self._conn: sqlite3.Connection | None = None
+        self._pid = 0
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def execute(self, sql: str, params: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Iterator
+import logging
+import sys
+
+from ..config import settings
+
+try:  # optional; without it spans are no-ops
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+
+logger = logging.getLogger("tracing")
+
+# A proxy until a provider is installed, so spans started before configure() are not lost
+# once it runs, and an externally configured provider (opentelemetry-instrument) is used as is.
+_tracer = trace.get_tracer("agentic_automator") if trace is not None else None
+_provider: Any = None
+
+
+def configure(exporter: str | None = None, path: str | None = None) -> None:
+    """Install an SDK tracer provider exporting to ``console``, a JSON-lines ``file`` or ``otlp``."""
+    global _provider
+    exporter = exporter or settings.TRACING_EXPORTER
+    if exporter == "none" or trace is None or _provider is not None:
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    except ImportError:
+        logger.warning("TRACING_EXPORTER is set but opentelemetry-sdk is not installed; spans are not exported")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.APP_NAME}))
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http is not installed; spans are not exported")
+            return
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    else:
+        out = sys.stdout if exporter == "console" else open(path or settings.TRACING_FILE_PATH, "a", encoding="utf-8")
+        # One JSON object per line, flushed as each span ends, so tests can read the file back.
+        provider.add_span_processor(SimpleSpanProcessor(
+            ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        ))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+
+
+def shutdown() -> None:
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Current-context span (``None`` without OpenTelemetry); ``None`` attributes are dropped."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(
+        name, attributes={key: value for key, value in attributes.items() if value is not None}
+    ) as current:
+        yield current
+
+
+def set_attributes(current: Any, **attributes: Any) -> None:
+    if current is not None:
+        current.set_attributes({key: value for key, value in attributes.items() if value is not None})
@@ -1,5 +1,7 @@
-"""Tools package."""
+"""Tools package.
 
-from . import web_fetch, github_search, pdf_extract, web_search, summarize
+Tool modules are imported on first use through ``app.agent.registry``; importing the
+package does not load them (or their parser dependencies).
+"""
 
 __all__ = ["web_fetch", "github_search", "pdf_extract", "web_search", "summarize"]
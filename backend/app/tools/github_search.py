@@ -1,24 +1,118 @@
 from typing import Any
-import httpx
+import asyncio
 import logging
+import time
 import urllib.parse
-import re
-from ..config import settings
+
+import httpx
 from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
-from app.tools.groq_api import summarize_query
+
+from ..agent.llm import llm_provider
+from ..config import settings
+from ..services.deadline import clamp
+from ..services.http_cache import http_cache
+from ..services.http_pool import http_clients
 
 logger = logging.getLogger("github_search")
 
-async def search(query: str) -> dict[str, Any]:
-    token = settings.GITHUB_TOKEN
+# GitHub rejects search queries longer than 256 characters, and long natural-language
+# queries rarely match anything; these are rewritten into keywords first.
+MAX_QUERY_CHARS = 256
+SHORTEN_AFTER_WORDS = 6
+
+_REPO_FIELDS = "nodes { ... on Repository { nameWithOwner description stargazerCount url primaryLanguage { name } } }"
+
+
+class GitHubThrottle:
+    """Tracks GitHub's per-resource quota from ``X-RateLimit-*`` headers.
+
+    Requests wait for the reset once the quota is spent (up to ``GITHUB_MAX_THROTTLE_WAIT``)
+    and are spread over the remaining window when fewer than ``GITHUB_RATE_LIMIT_RESERVE``
+    are left, instead of running into 403s.
+    """
+
+    def __init__(self) -> None:
+        self._limits: dict[str, tuple[int, float]] = {}  # resource -> (remaining, reset epoch)
+
+    def update(self, response: httpx.Response) -> None:
+        if response.extensions.get("http_cache") in {"hit", "stale"}:
+            return  # replayed headers describe an old quota
+        headers = response.headers
+        resource = headers.get("x-ratelimit-resource")
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if resource and remaining and reset and remaining.isdigit() and reset.isdigit():
+            self._limits[resource] = (int(remaining), float(reset))
+        retry_after = headers.get("retry-after")
+        if resource and retry_after and retry_after.isdigit() and response.status_code in {403, 429}:
+            # Secondary rate limit: no quota numbers, just a pause.
+            self._limits[resource] = (0, time.time() + int(retry_after))
+
+    def delay(self, resource: str) -> float:
+        remaining, reset = self._limits.get(resource, (1, 0.0))
+        window = reset - time.time()
+        if window <= 0:
+            return 0.0
+        if remaining <= 0:
+            return window
+        if remaining < settings.GITHUB_RATE_LIMIT_RESERVE:
+            return window / (remaining + 1)
+        return 0.0
+
+    async def acquire(self, resource: str) -> str | None:
+        """Wait for quota; returns an error message if the wait would be too long."""
+        wait = self.delay(resource)
+        if wait > settings.GITHUB_MAX_THROTTLE_WAIT:
+            return f"GitHub Rate Limit Exceeded (resets in {wait:.0f}s)."
+        remaining, reset = self._limits.get(resource, (1, 0.0))
+        if reset > time.time():
+            # Count this request now so concurrent callers see the reduced quota.
+            self._limits[resource] = (max(remaining - 1, 0), reset)
+        if wait:
+            logger.info(f"Throttling GitHub {resource} request for {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        now = time.time()
+        return {
+            resource: {"remaining": remaining, "resets_in": max(0.0, reset - now)}
+            for resource, (remaining, reset) in self._limits.items()
+        }
+
+
+throttle = GitHubThrottle()
+
+
+def _headers() -> dict[str, str]:
     headers = {
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28"
     }
-    
+    token = settings.GITHUB_TOKEN
     if token:
         headers["Authorization"] = f"token {token.strip()}"
+    return headers
 
+
+def _result(items: list[dict[str, Any]], clean_query: str) -> dict[str, Any]:
+    if not items:
+        return {"message": f"No results found for '{clean_query}'. Try broader keywords."}
+    return {"results": items}
+
+
+async def shorten_query(query: str) -> str:
+    prompt = (
+        "Rewrite the request below as a GitHub repository search query of at most five keywords. "
+        f"Reply with the keywords only.\n\nRequest: {query}"
+    )
+    shortened = await llm_provider.complete(prompt, max_tokens=32, tier="light", fallback=False)
+    lines = (shortened or "").strip().splitlines()
+    keywords = lines[0].strip().strip("\"'`") if lines else ""
+    return (keywords or query)[:MAX_QUERY_CHARS]
+
+
+async def prepare_query(query: str) -> str:
     # --- CLEANING LOGIC ---
     # 1. Remove common prefixes the Planner might leave behind
     for prefix in ["search github for", "find repos for", "search for"]:
@@ -28,49 +122,179 @@ async def search(query: str) -> dict[str, Any]:
     # 2. AGGRESSIVE: Remove quotes and special characters that break exact matching
     # We keep spaces, hyphens, and underscores.
     clean_query = query.replace('"', '').replace("'", "").strip()
-    
-    # 3. Fallback: If query is empty after cleaning, use "popular"
+
+    # 3. Long descriptions become keywords (through the shared, cached LLM provider)
+    if settings.GITHUB_SHORTEN_QUERIES and (
+        len(clean_query.split()) > SHORTEN_AFTER_WORDS or len(clean_query) > MAX_QUERY_CHARS
+    ):
+        clean_query = await shorten_query(clean_query)
+
+    # 4. Fallback: If query is empty after cleaning, use "popular"
     if not clean_query:
         clean_query = "popular"
 
     logger.info(f"Original Query: {query} | Cleaned Query for API: {clean_query}")
+    return clean_query[:MAX_QUERY_CHARS]
+
+
+async def _search_rest(clean_query: str) -> dict[str, Any]:
+    error = await throttle.acquire("search")
+    if error:
+        return {"error": error}
 
     # Encode for URL
     encoded_query = urllib.parse.quote(clean_query)
-    
+
     # We simply search by stars to guarantee "popular" results if the query is broad
-    url = f"https://api.github.com/search/repositories?q={encoded_query}&sort=stars&order=desc&per_page=5"
-    
-    async with httpx.AsyncClient(timeout=20) as client:
-        async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential()):
-            with attempt:
-                try:
-                    r = await client.get(url, headers=headers)
-                    
-                    if r.status_code == 401:
-                        return {"error": "GitHub API Key Invalid (401)."}
-                    if r.status_code == 403:
-                        return {"error": "GitHub Rate Limit Exceeded."}
-                        
-                    r.raise_for_status()
-                    data = r.json()
-                    items = []
-                    
-                    for it in data.get("items", [])[:5]:
-                        items.append({
-                            "name": it.get("full_name"),
-                            "description": it.get("description"),
-                            "stars": it.get("stargazers_count"),
-                            "url": it.get("html_url"),
-                            "language": it.get("language")
-                        })
-                    
-                    if not items:
-                        # Fallback: Try searching without sort restrictions if strict search failed
-                        return {"message": f"No results found for '{clean_query}'. Try broader keywords."}
-                        
-                    return {"results": items}
+    url = f"{settings.GITHUB_API_URL}/search/repositories?q={encoded_query}&sort=stars&order=desc&per_page=5"
+
+    client = http_clients.get_client(url)
+    async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential()):
+        with attempt:
+            try:
+                # Revalidated with the stored ETag; GitHub does not count 304s against the rate limit.
+                r = await http_cache.get(client, url, headers=_headers(), timeout=clamp(20))
+                throttle.update(r)
+
+                if r.status_code == 401:
+                    return {"error": "GitHub API Key Invalid (401)."}
+                if r.status_code in (403, 429):
+                    wait = throttle.delay("search")
+                    if wait:
+                        return {"error": f"GitHub Rate Limit Exceeded (resets in {wait:.0f}s)."}
+                    return {"error": "GitHub Rate Limit Exceeded."}
+
+                r.raise_for_status()
+                data = r.json()
+                items = []
+
+                for it in data.get("items", [])[:5]:
+                    items.append({
+                        "name": it.get("full_name"),
+                        "description": it.get("description"),
+                        "stars": it.get("stargazers_count"),
+                        "url": it.get("html_url"),
+                        "language": it.get("language")
+                    })
+
+                return _result(items, clean_query)
+
+            except Exception as e:
+                logger.error(f"GitHub search error: {e}")
+                return {"error": str(e)}
+
+
+async def search_graphql(queries: list[str]) -> list[dict[str, Any]]:
+    """Run several repository searches in one GraphQL request (needs ``GITHUB_TOKEN``)."""
+    error = await throttle.acquire("graphql")
+    if error:
+        return [{"error": error} for _ in queries]
+
+    variables = {f"q{i}": f"{query} sort:stars-desc" for i, query in enumerate(queries)}
+    declarations = ", ".join(f"${name}: String!" for name in variables)
+    fields = " ".join(
+        f"{name}: search(query: ${name}, type: REPOSITORY, first: 5) {{ {_REPO_FIELDS} }}" for name in variables
+    )
+    url = f"{settings.GITHUB_API_URL}/graphql"
+    client = http_clients.get_client(url)
+    r = await client.post(
+        url,
+        json={"query": f"query({declarations}) {{ {fields} }}", "variables": variables},
+        headers=_headers(),
+        timeout=clamp(20),
+    )
+    throttle.update(r)
+    r.raise_for_status()
+    payload = r.json()
+
+    data = payload.get("data") or {}
+    errors = {
+        (err.get("path") or [None])[0]: err.get("message", "GitHub GraphQL search failed")
+        for err in payload.get("errors") or []
+    }
+    results = []
+    for name, query in zip(variables, queries):
+        found = data.get(name)
+        if found is None:
+            results.append({"error": errors.get(name) or errors.get(None) or "GitHub GraphQL search failed"})
+            continue
+        items = [
+            {
+                "name": node.get("nameWithOwner"),
+                "description": node.get("description"),
+                "stars": node.get("stargazerCount"),
+                "url": node.get("url"),
+                "language": (node.get("primaryLanguage") or {}).get("name"),
+            }
+            for node in found.get("nodes") or []
+            if node
+        ]
+        results.append(_result(items, query))
+    return results
+
+
+class SearchBatcher:
+    """Collects searches issued within ``GITHUB_BATCH_WINDOW`` seconds of each other, e.g. the
+    GitHub steps of one plan that become ready together, and sends them as a single GraphQL
+    request. A lone search goes over REST, where conditional requests keep it cheap.
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def search(self, clean_query: str) -> dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((clean_query, future))
+        if len(self._pending) >= settings.GITHUB_BATCH_MAX:
+            self._spawn(self._run(self._take()))
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+        return await future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take(self) -> list[tuple[str, asyncio.Future]]:
+        batch, self._pending = self._pending, []
+        return batch
 
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(settings.GITHUB_BATCH_WINDOW)
+        self._timer = None
+        batch = self._take()
+        if batch:
+            await self._run(batch)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        queries = [query for query, _ in batch]
+        try:
+            if len(batch) == 1:
+                results = [await _search_rest(queries[0])]
+            else:
+                self.batches += 1
+                try:
+                    results = await search_graphql(queries)
                 except Exception as e:
-                    logger.error(f"GitHub search error: {e}")
-                    return {"error": str(e)}
\ No newline at end of file
+                    logger.error(f"GitHub GraphQL batch failed, falling back to REST: {e}")
+                    results = await asyncio.gather(*(_search_rest(query) for query in queries))
+        except Exception as e:
+            results = [{"error": str(e)}] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+batcher = SearchBatcher()
+
+
+async def search(query: str) -> dict[str, Any]:
+    clean_query = await prepare_query(query)
+    if settings.GITHUB_GRAPHQL_BATCH and settings.GITHUB_TOKEN:
+        return await batcher.search(clean_query)
+    return await _search_rest(clean_query)
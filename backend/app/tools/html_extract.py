@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, AsyncIterator
+
+from ..config import settings
+
+try:  # optional C parser, several times faster than html.parser
+    from lxml import etree as lxml_etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - optional dependency
+    lxml_etree = lxml_html = None
+
+ENGINES = ("lxml", "stdlib") if lxml_html is not None else ("stdlib",)
+
+# Subtrees that never hold the main content of a page.
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "header",
+    "footer", "aside", "form", "button", "select", "textarea", "head",
+}
+BLOCK_TAGS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "dd", "dt", "figcaption", "td"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+MAIN_TAGS = {"article", "main"}
+INLINE_TAGS = {
+    "a", "abbr", "b", "bdi", "cite", "code", "em", "font", "i", "kbd", "label", "mark", "q", "s", "small",
+    "span", "strong", "sub", "sup", "time", "u",
+}
+_P_CLOSERS = {"p", "div", "ul", "ol", "dl", "table", "pre", "blockquote", "section", "article", "main", "h1",
+              "h2", "h3", "h4", "h5", "h6", "figure", "header", "footer", "nav", "aside", "form", "hr"}
+IMPLIED_END = {tag: {"p"} for tag in _P_CLOSERS}
+IMPLIED_END["li"] = {"li", "p"}
+IMPLIED_END["dt"] = IMPLIED_END["dd"] = {"dt", "dd", "p"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BOILERPLATE_HINT = re.compile(
+    r"(^|[-_\s])(nav|navbar|menu|footer|sidebar|cookie|consent|banner|breadcrumbs?|share|social|"
+    r"related|comments?|advert|ads?|promo|newsletter|subscribe|popup|modal)([-_\s]|$)",
+    re.IGNORECASE,
+)
+_WHITESPACE = re.compile(r"\s+")
+# lxml rejects str input that carries an encoding declaration (XHTML pages); the text is already decoded.
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+# One single-threaded executor per HTML worker. A page is parsed start to finish on one of
+# them: an lxml pull parser uses the string dictionary of the thread that created it, which
+# other threads must not touch while it parses.
+_lanes: list[ThreadPoolExecutor] | None = None
+_next_lane = itertools.count()
+
+
+def get_lane() -> ThreadPoolExecutor:
+    global _lanes
+    if _lanes is None:
+        _lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"html-extract-{i}")
+            for i in range(max(1, settings.HTML_WORKERS))
+        ]
+    return _lanes[next(_next_lane) % len(_lanes)]
+
+
+def shutdown_pool() -> None:
+    global _lanes
+    if _lanes is not None:
+        for lane in _lanes:
+            lane.shutdown(wait=False, cancel_futures=True)
+        _lanes = None
+
+
+class ContentCollector:
+    """Turns a stream of start/end/text events into main-content text.
+
+    Keeps block-level text (paragraphs, list items, headings, ...) outside boilerplate
+    subtrees, drops link-heavy blocks, and prefers text inside ``<article>``/``<main>``
+    when the page has one. ``done`` flips once ``max_chars`` of usable text is collected,
+    so callers can stop parsing (and downloading) early.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.title: str | None = None
+        self._stack: list[tuple[str, bool, bool]] = []  # (tag, starts a skipped subtree, starts a block)
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._seen_main = False
+        self._in_title = False
+        self._title_parts: list[str] = []
+        self._block: list[str] | None = None
+        self._block_tag = ""
+        self._block_link_chars = 0
+        self._link_depth = 0
+        self._main_blocks: list[str] = []
+        self._other_blocks: list[str] = []
+        self._main_chars = 0
+        self._other_chars = 0
+
+    @property
+    def done(self) -> bool:
+        if self._seen_main:
+            return self._main_chars >= self.max_chars
+        return self._other_chars >= self.max_chars
+
+    def start(self, tag: str, attrs: dict[str, str | None]) -> None:
+        if tag in VOID_TAGS:
+            return
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        self._close_implied(tag)
+        hint = f"{attrs.get('class') or ''} {attrs.get('id') or ''} {attrs.get('role') or ''}"
+        skipped = tag in SKIP_TAGS or bool(BOILERPLATE_HINT.search(hint))
+        starts_block = not skipped and not self._skip_depth and tag in BLOCK_TAGS and self._block is None
+        self._stack.append((tag, skipped, starts_block))
+        if skipped:
+            self._skip_depth += 1
+            return
+        if tag in MAIN_TAGS:
+            self._main_depth += 1
+            self._seen_main = True
+        if tag == "a":
+            self._link_depth += 1
+        if starts_block:
+            self._block = []
+            self._block_tag = tag
+            self._block_link_chars = 0
+
+    def _close_implied(self, tag: str) -> None:
+        # html.parser does not apply HTML's optional end tags; close an open <p>/<li>/<dt>/<dd>
+        # when a tag arrives that implicitly ends it, as a browser (and lxml) would.
+        closes = IMPLIED_END.get(tag)
+        if not closes:
+            return
+        for open_tag, _, _ in reversed(self._stack):
+            if open_tag in closes:
+                self.end(open_tag)
+                return
+            if open_tag not in INLINE_TAGS:
+                return
+
+    def end(self, tag: str) -> None:
+        if tag == "title":
+            self._in_title = False
+            if self.title is None and self._title_parts:
+                self.title = _WHITESPACE.sub(" ", "".join(self._title_parts)).strip()
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return  # stray end tag
+        while self._stack:
+            open_tag, skipped, starts_block = self._stack.pop()
+            if skipped:
+                self._skip_depth -= 1
+            elif open_tag in MAIN_TAGS:
+                self._main_depth -= 1
+            elif open_tag == "a":
+                self._link_depth -= 1
+            if starts_block:
+                self._flush_block()
+            if open_tag == tag:
+                break
+
+    def text(self, data: str | None) -> None:
+        if not data:
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+        if self._skip_depth or self._block is None:
+            return
+        self._block.append(data)
+        if self._link_depth:
+            self._block_link_chars += len(data.strip())
+
+    def _flush_block(self) -> None:
+        text = _WHITESPACE.sub(" ", "".join(self._block or [])).strip()
+        link_chars = self._block_link_chars
+        self._block = None
+        self._block_link_chars = 0
+        # Headings are short by nature; elsewhere short fragments are usually UI chrome.
+        min_chars = 2 if self._block_tag in HEADING_TAGS else settings.HTML_MIN_BLOCK_CHARS
+        if len(text) < min_chars or link_chars > 0.5 * len(text):
+            return
+        if self._main_depth:
+            self._main_blocks.append(text)
+            self._main_chars += len(text) + 1
+        else:
+            self._other_blocks.append(text)
+            self._other_chars += len(text) + 1
+
+    def result(self) -> tuple[str | None, str]:
+        if self._block is not None:
+            self._flush_block()
+        blocks = self._main_blocks if self._main_chars >= 200 else self._main_blocks + self._other_blocks
+        return self.title, "\n".join(blocks)[: self.max_chars]
+
+
+class StreamingExtractor(HTMLParser):
+    """Incremental stdlib parser: feed chunks as they arrive and stop once ``done``."""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.collector = ContentCollector(max_chars)
+
+    @property
+    def done(self) -> bool:
+        return self.collector.done
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        pass
+
+    def handle_endtag(self, tag: str) -> None:
+        self.collector.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.collector.text(data)
+
+    def result(self) -> tuple[str | None, str]:
+        return self.collector.result()
+
+
+class PullExtractor:
+    """Incremental lxml parser with the same interface as :class:`StreamingExtractor`.
+
+    lxml reports elements, not text, so the text between two events (the ``text`` of an
+    element just opened, or the ``tail`` of one just closed or of a comment) is handed to the
+    collector when the next event arrives; by then the parser has seen all of it. Should
+    lxml reject the page, what was received is replayed through html.parser instead.
+    """
+
+    def __init__(self, max_chars: int):
+        self.collector = ContentCollector(max_chars)
+        self._parser = lxml_etree.HTMLPullParser(events=("start", "end", "comment", "pi"))
+        self._last: tuple[str, Any] | None = None
+        self._received: list[str] = []
+        self._fallback: StreamingExtractor | None = None
+
+    @property
+    def done(self) -> bool:
+        if self._fallback is not None:
+            return self._fallback.done
+        return self.collector.done
+
+    def feed(self, data: str) -> None:
+        if self._fallback is not None:
+            self._fallback.feed(data)
+            return
+        self._received.append(data)
+        try:
+            self._parser.feed(data)
+        except lxml_etree.LxmlError:
+            self._fall_back()
+            return
+        self._drain()
+
+    def _drain(self) -> None:
+        for event, element in self._parser.read_events():
+            if self.collector.done:
+                return
+            if self._last is not None:
+                last_event, last = self._last
+                self.collector.text(last.text if last_event == "start" else last.tail)
+            if event in ("comment", "pi"):
+                # Its tail is the text that follows, like that of a closed element.
+                self._last = ("end", element)
+                continue
+            self._last = (event, element)
+            if event == "start":
+                self.collector.start(element.tag, dict(element.attrib))
+            else:
+                self.collector.end(element.tag)
+
+    def _fall_back(self) -> None:
+        self._fallback = StreamingExtractor(self.collector.max_chars)
+        self._fallback.feed("".join(self._received))
+        self._received = []
+
+    def result(self) -> tuple[str | None, str]:
+        if self._fallback is None and not self.collector.done:
+            try:
+                self._parser.close()
+            except lxml_etree.LxmlError:
+                # e.g. "Document is empty" for a blank or comment-only body.
+                self._fall_back()
+            else:
+                self._drain()
+        if self._fallback is not None:
+            return self._fallback.result()
+        return self.collector.result()
+
+
+def extract_stdlib(html: str, max_chars: int) -> tuple[str | None, str]:
+    parser = StreamingExtractor(max_chars)
+    # Feed in slices so a page that fills the budget early is not parsed to the end.
+    for offset in range(0, len(html), 16384):
+        parser.feed(html[offset:offset + 16384])
+        if parser.done:
+            break
+    return parser.result()
+
+
+def extract_lxml(html: str, max_chars: int) -> tuple[str | None, str]:
+    collector = ContentCollector(max_chars)
+    root = lxml_html.document_fromstring(_XML_DECLARATION.sub("", html, count=1))
+    for event, element in lxml_etree.iterwalk(root, events=("start", "end")):
+        tag = element.tag
+        if not isinstance(tag, str):  # comments and processing instructions
+            if event == "end":
+                collector.text(element.tail)
+            continue
+        if event == "start":
+            collector.start(tag, dict(element.attrib))
+            collector.text(element.text)
+        else:
+            collector.end(tag)
+            collector.text(element.tail)
+            if collector.done:
+                break
+    return collector.result()
+
+
+def extract(html: str, max_chars: int, engine: str | None = None) -> tuple[str | None, str]:
+    engine = engine or select_engine()
+    if engine == "lxml":
+        try:
+            return extract_lxml(html, max_chars)
+        except (lxml_etree.ParserError, ValueError):
+            # e.g. "Document is empty" for a blank or comment-only body; html.parser takes anything.
+            return extract_stdlib(html, max_chars)
+    return extract_stdlib(html, max_chars)
+
+
+def select_engine() -> str:
+    if settings.HTML_ENGINE != "auto":
+        return settings.HTML_ENGINE
+    return ENGINES[0]
+
+
+async def extract_stream(chunks: AsyncIterator[str], max_chars: int, max_bytes: int) -> dict[str, Any]:
+    """Extract main text from a streamed page without blocking the event loop.
+
+    Chunks are parsed on an HTML worker thread as they arrive, and the download stops once
+    the text budget is met or ``max_bytes`` have been received.
+    """
+    loop = asyncio.get_running_loop()
+    lane = get_lane()
+    engine = select_engine()
+    factory = StreamingExtractor if engine == "stdlib" else PullExtractor
+    parser = await loop.run_in_executor(lane, factory, max_chars)
+    received = 0
+    async for chunk in chunks:
+        await loop.run_in_executor(lane, parser.feed, chunk)
+        received += len(chunk)
+        if parser.done or received >= max_bytes:
+            break
+    title, text = await loop.run_in_executor(lane, parser.result)
+    return {"title": title, "text": text, "engine": engine, "truncated_download": parser.done}
@@ -1,45 +1,155 @@
 from __future__ import annotations
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from io import BytesIO
+import mmap
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
 from typing import Any
 from urllib.parse import urlparse
 
-import httpx
 from PyPDF2 import PdfReader
 
+from ..config import settings
+from ..services.deadline import clamp
+from ..services.http_pool import http_clients
+from .summarize import map_reduce
 
-def _extract_bytes(data: bytes, source: str) -> dict[str, Any]:
+_pool: ProcessPoolExecutor | None = None
+
+
+def _workers() -> int:
+    return settings.PDF_WORKERS or min(4, os.cpu_count() or 1)
+
+
+def get_pool() -> Executor:
+    # One long-lived pool: PyPDF2 is pure Python, so threads would just contend for the GIL.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=_workers(),
+            # spawn: forking a process that runs an event loop and threads is not safe.
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _open(path: str) -> tuple[PdfReader, mmap.mmap]:
+    # Memory-map the file so pages are read straight from the page cache rather than copied
+    # into a Python buffer up front.
+    with open(path, "rb") as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    return PdfReader(mapped), mapped
+
+
+def _page_count(path: str) -> int:
+    reader, mapped = _open(path)
+    try:
+        return len(reader.pages)
+    finally:
+        mapped.close()
+
+
+def _extract_pages(path: str, start: int, stop: int, max_chars: int) -> str:
+    reader, mapped = _open(path)
     try:
-        reader = PdfReader(BytesIO(data))
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-        return {"source": source, "text": "\n".join(text)[:20000]}
+        text: list[str] = []
+        size = 0
+        for index in range(start, stop):
+            page_text = reader.pages[index].extract_text() or ""
+            text.append(page_text)
+            size += len(page_text) + 1
+            if size >= max_chars:
+                break
+        return "\n".join(text)
+    finally:
+        mapped.close()
+
+
+async def _extract_file(path: str, source: str) -> dict[str, Any]:
+    """Extract page ranges in parallel, one wave of ranges per pool worker, in page order.
+
+    Stops scheduling further waves once enough text has been collected: ``PDF_MAX_CHARS``, or
+    ``PDF_SUMMARY_MAX_CHARS`` when longer documents are summarized.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    # With summaries on, read up to PDF_SUMMARY_MAX_CHARS so the summary covers the document
+    # rather than its first PDF_MAX_CHARS.
+    max_chars = max(settings.PDF_MAX_CHARS, settings.PDF_SUMMARY_MAX_CHARS if settings.PDF_SUMMARIZE else 0)
+    chunk = settings.PDF_PAGES_PER_TASK
+    try:
+        pages = await loop.run_in_executor(pool, _page_count, path)
+        ranges = [(start, min(start + chunk, pages)) for start in range(0, pages, chunk)]
+        wave = _workers()
+
+        parts: list[str] = []
+        collected = 0
+        for offset in range(0, len(ranges), wave):
+            futures = [
+                loop.run_in_executor(pool, _extract_pages, path, start, stop, max_chars)
+                for start, stop in ranges[offset:offset + wave]
+            ]
+            for text in await asyncio.gather(*futures):
+                parts.append(text)
+                collected += len(text) + 1
+            if collected >= max_chars:
+                break
+        text = "\n".join(parts)[:max_chars]
     except Exception as exc:
         return {"source": source, "error": str(exc)}
 
+    result: dict[str, Any] = {"source": source, "text": text[: settings.PDF_MAX_CHARS]}
+    if settings.PDF_SUMMARIZE and len(text) > settings.PDF_MAX_CHARS:
+        try:
+            result["summary"], result["chunks"] = await map_reduce(text)
+        except Exception as exc:
+            result["summary_error"] = str(exc)
+    return result
+
 
-def _extract_file(path: str) -> dict[str, Any]:
+async def _download(url: str) -> str:
+    """Stream the response to a temporary file, refusing bodies over ``PDF_MAX_DOWNLOAD_BYTES``."""
+    limit = settings.PDF_MAX_DOWNLOAD_BYTES
+    client = http_clients.get_client(url)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
     try:
-        reader = PdfReader(path)
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-        return {"source": path, "text": "\n".join(text)[:20000]}
-    except Exception as exc:
-        return {"source": path, "error": str(exc)}
+        with os.fdopen(fd, "wb") as out:
+            async with client.stream("GET", url, timeout=clamp(30)) as response:
+                response.raise_for_status()
+                declared = response.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > limit:
+                    raise ValueError(f"PDF is {declared} bytes, over the {limit} byte limit")
+                written = 0
+                async for data in response.aiter_bytes(64 * 1024):
+                    written += len(data)
+                    if written > limit:
+                        raise ValueError(f"PDF exceeds the {limit} byte limit")
+                    out.write(data)
+        return path
+    except BaseException:
+        os.unlink(path)
+        raise
 
 
 async def extract(path_or_url: str) -> dict[str, Any]:
     parsed = urlparse(path_or_url)
     if parsed.scheme in {"http", "https"}:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(path_or_url)
-            response.raise_for_status()
-            return _extract_bytes(response.content, path_or_url)
+        try:
+            path = await _download(path_or_url)
+        except ValueError as exc:
+            return {"source": path_or_url, "error": str(exc)}
+        try:
+            return await _extract_file(path, path_or_url)
+        finally:
+            os.unlink(path)
 
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        return await loop.run_in_executor(executor, _extract_file, path_or_url)
+    return await _extract_file(path_or_url, path_or_url)
@@ -1,8 +1,100 @@
 from typing import Any
+import asyncio
+import hashlib
+import re
+
+from ..agent.context_packer import count_tokens
 from ..agent.llm import llm_provider
+from ..config import settings
+from ..services.llm_cache import completion_cache, make_key
+
+_PARAGRAPH = re.compile(r"\n\s*\n|\n")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+MAP_PROMPT = (
+    "Summarize the following part of a longer document concisely. "
+    "Keep names, numbers and conclusions:\n{text}"
+)
+REDUCE_PROMPT = "Combine these summaries of consecutive parts of one document into a single concise summary:\n{text}"
+PART_TOKENS = 300
+
+
+def split_chunks(text: str, chunk_tokens: int) -> list[str]:
+    """Split on paragraph, then sentence, then word boundaries into chunks of at most ~chunk_tokens."""
+    pieces: list[tuple[str, int]] = []
+    for paragraph in _PARAGRAPH.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens <= chunk_tokens:
+            pieces.append((paragraph, tokens))
+            continue
+        for sentence in _SENTENCE.split(paragraph):
+            tokens = count_tokens(sentence)
+            if tokens <= chunk_tokens:
+                pieces.append((sentence, tokens))
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * chunk_tokens // tokens)
+            pieces.extend((" ".join(words[i:i + step]), chunk_tokens) for i in range(0, len(words), step))
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for piece, tokens in pieces:
+        if current and size + tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+async def _summarize_part(template: str, text: str, semaphore: asyncio.Semaphore, use_cache: bool) -> str:
+    # Keyed on a hash of the content alone, so a re-run over the same document (or an
+    # overlapping one) only pays for the parts it has not seen.
+    key = make_key("summary-part", template + hashlib.sha256(text.encode("utf-8")).hexdigest(), PART_TOKENS)
+    if use_cache:
+        cached = await completion_cache.get(key)
+        if cached is not None:
+            return cached
+    async with semaphore:
+        summary = await llm_provider.complete(
+            template.format(text=text), max_tokens=PART_TOKENS, use_cache=False, tier="light", fallback=False
+        )
+    if summary is None:
+        # No provider answered; keep the opening of the part rather than losing it.
+        return text[:800]
+    await completion_cache.set(key, summary)
+    return summary
+
+
+async def map_reduce(text: str, use_cache: bool = True) -> tuple[str, int]:
+    """Summarize ``text`` of any length: chunks are summarized concurrently (map), then
+    the partial summaries are combined in groups that fit a chunk until one is left (reduce).
+    Returns the summary and the number of chunks."""
+    chunk_tokens = settings.SUMMARY_CHUNK_TOKENS
+    semaphore = asyncio.Semaphore(settings.SUMMARY_CONCURRENCY)
+    chunks = split_chunks(text, chunk_tokens)
+    parts = await asyncio.gather(*(_summarize_part(MAP_PROMPT, chunk, semaphore, use_cache) for chunk in chunks))
+    while len(parts) > 1:
+        groups = split_chunks("\n\n".join(parts), chunk_tokens)
+        if len(groups) >= len(parts):
+            # Summaries did not shrink (e.g. fallback text); pair them up so the loop ends.
+            groups = ["\n\n".join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+        parts = await asyncio.gather(
+            *(_summarize_part(REDUCE_PROMPT, group, semaphore, use_cache) for group in groups)
+        )
+    return (parts[0] if parts else ""), len(chunks)
 
 
-async def summarize_text(text: str) -> dict[str, Any]:
-    prompt = f"Summarize the following text concisely:\n{text[:4000]}"
-    res = await llm_provider.complete(prompt)
-    return {"summary": res}
+async def summarize_text(text: str, use_cache: bool = True) -> dict[str, Any]:
+    if count_tokens(text) <= settings.SUMMARY_CHUNK_TOKENS:
+        prompt = f"Summarize the following text concisely:\n{text}"
+        res = await llm_provider.complete(prompt, use_cache=use_cache, tier="light")
+        return {"summary": res}
+    summary, chunks = await map_reduce(text, use_cache=use_cache)
+    return {"summary": summary, "chunks": chunks}
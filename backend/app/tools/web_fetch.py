@@ -1,8 +1,13 @@
 from typing import Any
-import httpx
-from bs4 import BeautifulSoup
 from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
+from ..config import settings
+from ..services.deadline import clamp, stop_at_deadline
+from ..services.http_cache import http_cache
+from ..services.http_pool import http_clients
+from ..services.metrics import count_retry
+from . import html_extract
+
 
 async def fetch(query: str) -> dict[str, Any]:
     # try to extract URL from query
@@ -16,14 +21,15 @@ async def fetch(query: str) -> dict[str, Any]:
         # If no url, try google query via text
         return {"error": "no URL found in query", "query": query}
 
-    async with httpx.AsyncClient(timeout=20) as client:
-        async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential()):
-            with attempt:
-                r = await client.get(url)
+    client = http_clients.get_client(url)
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(3) | stop_at_deadline(), wait=wait_exponential(), before_sleep=count_retry("web_fetch")
+    ):
+        with attempt:
+            async with http_cache.stream(client, url, timeout=clamp(20)) as r:
                 r.raise_for_status()
-                soup = BeautifulSoup(r.text, "html.parser")
-                for s in soup(["script", "style"]):
-                    s.decompose()
-                text = "\n".join([p.get_text(separator=" ") for p in soup.find_all("p")])
-                title = soup.title.string if soup.title else url
-                return {"url": url, "title": title, "text": text[:10000]}
+                # Parsed incrementally off the event loop; the download stops once enough text is in.
+                page = await html_extract.extract_stream(
+                    r.aiter_text(64 * 1024), settings.WEB_FETCH_MAX_CHARS, settings.WEB_FETCH_MAX_BYTES
+                )
+            return {"url": url, "title": page["title"] or url, "text": page["text"]}
@@ -1,28 +1,39 @@
 from typing import Any
 from urllib.parse import quote_plus
 
-import httpx
 from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
 from ..config import settings
+from ..services.deadline import clamp, stop_at_deadline
+from ..services.http_cache import http_cache
+from ..services.http_pool import http_clients
+from ..services.metrics import count_retry
 
 
 async def search(query: str) -> dict[str, Any]:
     key = settings.SERP_API_KEY
     if key:
-        url = "https://serpapi.com/search.json"
+        url = settings.SERPAPI_URL
         params = {"q": query, "api_key": key}
-        async with httpx.AsyncClient(timeout=20) as client:
-            async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential()):
-                with attempt:
-                    response = await client.get(url, params=params)
-                    response.raise_for_status()
-                    return {"source": "serpapi", "data": response.json()}
-
-    search_url = f"https://duckduckgo.com/html/?q={quote_plus(query)}"
-    async with httpx.AsyncClient(timeout=20) as client:
-        async for attempt in AsyncRetrying(stop=stop_after_attempt(2), wait=wait_exponential()):
+        client = http_clients.get_client(url)
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(3) | stop_at_deadline(), wait=wait_exponential(), before_sleep=count_retry("serpapi")
+        ):
             with attempt:
-                response = await client.get(search_url)
+                response = await http_cache.get(
+                    client, url, params=params, timeout=clamp(20), heuristic_ttl=settings.HTTP_CACHE_SEARCH_TTL
+                )
                 response.raise_for_status()
-                return {"source": "duckduckgo_html", "html_snippet": response.text[:8000]}
+                return {"source": "serpapi", "data": response.json()}
+
+    search_url = f"{settings.DUCKDUCKGO_URL}?q={quote_plus(query)}"
+    client = http_clients.get_client(search_url)
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(2) | stop_at_deadline(), wait=wait_exponential(), before_sleep=count_retry("duckduckgo")
+    ):
+        with attempt:
+            response = await http_cache.get(
+                client, search_url, timeout=clamp(20), heuristic_ttl=settings.HTTP_CACHE_SEARCH_TTL
+            )
+            response.raise_for_status()
+            return {"source": "duckduckgo_html", "html_snippet": response.text[:8000]}
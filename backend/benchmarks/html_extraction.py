@@ -0,0 +1,77 @@
+"""Throughput and text quality of the web_fetch HTML extraction engines.
+
+Runs every engine over the saved pages in ``benchmarks/html_corpus`` (each ``.html`` has a
+``.txt`` with the hand-picked main content) and reports pages/s, MB/s and token-level
+precision/recall/F1 against that reference. ``bs4`` is the previous implementation:
+BeautifulSoup with ``html.parser``, joining every ``<p>``.
+
+    cd backend && pip install -r benchmarks/requirements.txt
+    python -m benchmarks.html_extraction --rounds 50
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from app.tools import html_extract
+
+CORPUS = Path(__file__).parent / "html_corpus"
+MAX_CHARS = 10000
+_TOKEN = re.compile(r"\w+")
+
+
+def extract_bs4(html: str, max_chars: int) -> tuple[str | None, str]:
+    soup = BeautifulSoup(html, "html.parser")
+    for s in soup(["script", "style"]):
+        s.decompose()
+    text = "\n".join([p.get_text(separator=" ") for p in soup.find_all("p")])
+    title = soup.title.string if soup.title else None
+    return title, text[:max_chars]
+
+
+def _tokens(text: str) -> Counter:
+    return Counter(t.lower() for t in _TOKEN.findall(text))
+
+
+def score(extracted: str, reference: str) -> tuple[float, float, float]:
+    got, want = _tokens(extracted), _tokens(reference)
+    overlap = sum((got & want).values())
+    precision = overlap / max(1, sum(got.values()))
+    recall = overlap / max(1, sum(want.values()))
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def main(rounds: int) -> None:
+    pages = [(p.stem, p.read_text(), p.with_suffix(".txt").read_text()) for p in sorted(CORPUS.glob("*.html"))]
+    total_bytes = sum(len(html.encode()) for _, html, _ in pages)
+    engines = {"bs4": extract_bs4}
+    for engine in html_extract.ENGINES:
+        engines[engine] = lambda html, max_chars, engine=engine: html_extract.extract(html, max_chars, engine)
+
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KiB, {rounds} rounds\n")
+    print(f"{'engine':<8} {'pages/s':>9} {'MB/s':>7} {'precision':>10} {'recall':>7} {'f1':>6}")
+    for name, fn in engines.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, html, _ in pages:
+                fn(html, MAX_CHARS)
+        elapsed = time.perf_counter() - start
+
+        scores = [score(fn(html, MAX_CHARS)[1], reference) for _, html, reference in pages]
+        precision, recall, f1 = (sum(col) / len(scores) for col in zip(*scores))
+        pages_per_s = rounds * len(pages) / elapsed
+        mb_per_s = rounds * total_bytes / elapsed / 1e6
+        print(f"{name:<8} {pages_per_s:>9.1f} {mb_per_s:>7.2f} {precision:>10.3f} {recall:>7.3f} {f1:>6.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+    main(args.rounds)
@@ -0,0 +1,215 @@
+"""End-to-end load test of ``/plan`` and ``/execute`` against local upstream stubs.
+
+By default it starts ``benchmarks.stubs`` and the backend (``app.serve``) as subprocesses, with
+the backend pointed at the stubs, then keeps ``--concurrency`` requests in flight until
+``--requests`` have completed. Goals come from ``goal_log.tsv``. It reports throughput,
+status counts and client-side latency percentiles (time to first event for the
+``stream`` endpoint), plus the backend's own per-tool/model percentiles from
+``/api/v1/stats`` and the calls each stubbed upstream received.
+
+    cd backend && python -m benchmarks.load --endpoint execute --requests 200 --concurrency 16
+    cd backend && python -m benchmarks.load --endpoint plan --stub-latency 0.3 --error-rate 0.05 \\
+        --env PLAN_CACHE_ENABLED=false
+    cd backend && python -m benchmarks.load --target http://127.0.0.1:8000   # an already running backend
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+
+from app.services.analytics import percentile
+
+from .stubs import env as stub_env
+
+GOAL_LOG = Path(__file__).with_name("goal_log.tsv")
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_goals() -> list[str]:
+    return [line.split("\t", 1)[1] for line in GOAL_LOG.read_text(encoding="utf-8").splitlines() if "\t" in line]
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+@contextmanager
+def _spawn(args: list[str], extra_env: dict[str, str]) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen(
+        [sys.executable, *args], cwd=BACKEND_DIR, env={**os.environ, **extra_env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _one(client: httpx.AsyncClient, endpoint: str, goal: str, args: argparse.Namespace) -> tuple[float, int]:
+    plan_request = {"goal": goal, "max_steps": args.max_steps, "bypass_cache": args.bypass_cache}
+    started = time.perf_counter()
+    if endpoint == "plan":
+        response = await client.post("/api/v1/agent/plan", json=plan_request)
+        return time.perf_counter() - started, response.status_code
+    body = {"plan_request": plan_request}
+    if args.deadline:
+        body["deadline"] = args.deadline
+    if endpoint == "execute":
+        response = await client.post("/api/v1/agent/execute", json=body)
+        return time.perf_counter() - started, response.status_code
+    # stream: latency is the time to the first event; the rest of the stream is drained.
+    first_event = None
+    async with client.stream("POST", "/api/v1/agent/execute/stream", json=body) as response:
+        async for line in response.aiter_lines():
+            if first_event is None and line.startswith("event:"):
+                first_event = time.perf_counter() - started
+    return (first_event if first_event is not None else time.perf_counter() - started), response.status_code
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> dict:
+    goals = load_goals()
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    issued = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, headers=args.headers) as client:
+        async def worker() -> None:
+            nonlocal issued
+            while issued < args.requests:
+                goal = goals[issued % len(goals)]
+                issued += 1
+                try:
+                    elapsed, status = await _one(client, args.endpoint, goal, args)
+                except httpx.HTTPError as exc:
+                    elapsed, status = 0.0, type(exc).__name__
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+        server = (await client.get("/api/v1/stats")).json()
+
+    return {
+        "endpoint": args.endpoint,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "wall_seconds": wall,
+        "throughput_rps": args.requests / wall,
+        "statuses": statuses,
+        "latency": {
+            name: percentile(latencies, pct) for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+        "server": server,
+    }
+
+
+def report(result: dict, upstream: dict | None) -> None:
+    print(
+        f"{result['endpoint']}: {result['requests']} requests, concurrency {result['concurrency']}, "
+        f"{result['wall_seconds']:.1f}s, {result['throughput_rps']:.1f} req/s"
+    )
+    print("  statuses: " + ", ".join(f"{code} x{count}" for code, count in sorted(result["statuses"].items())))
+    print("  latency:  " + "  ".join(
+        f"{name} {value * 1000:.0f}ms" for name, value in result["latency"].items() if value is not None
+    ))
+    for kind in ("tool", "model", "endpoint"):
+        for name, stats in result["server"].get(kind, {}).items():
+            window = stats["total"]
+            if window.get("count"):
+                print(
+                    f"  {kind:<8} {name:<40} n={window['count']:<6} p50 {window['p50'] * 1000:7.0f}ms  "
+                    f"p95 {window['p95'] * 1000:7.0f}ms  p99 {window['p99'] * 1000:7.0f}ms"
+                )
+    if upstream:
+        print("  upstream calls: " + ", ".join(
+            f"{name} {c['calls']} ({c['errors']} 500s, {c['throttled']} 429s)" for name, c in sorted(upstream.items())
+        ))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", choices=["plan", "execute", "stream"], default="execute")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-steps", type=int, default=5)
+    parser.add_argument("--deadline", type=float, default=None, help="Per-run deadline sent with /execute")
+    parser.add_argument("--bypass-cache", action="store_true", help="Send bypass_cache with every request")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--target", help="Base URL of a running backend; skips starting stubs and backend")
+    parser.add_argument("--api-key", help="x-api-key for a target with API_AUTH_KEY set")
+    parser.add_argument("--port", type=int, default=8098, help="Port for the spawned backend")
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the spawned backend (0 = all cores)")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE setting for the spawned backend")
+    parser.add_argument("--json", help="Write the result to this file")
+    args = parser.parse_args()
+    args.headers = {"x-api-key": args.api_key} if args.api_key else {}
+
+    if args.target:
+        result = await run_load(args.target, args)
+        report(result, None)
+    else:
+        stub_url = f"http://127.0.0.1:{args.stub_port}"
+        backend_url = f"http://127.0.0.1:{args.port}"
+        backend_env = {
+            **stub_env(stub_url),
+            # The load generator is one client; its requests must not be rate limited by the backend.
+            "RATE_LIMIT_PER_MINUTE": "100000000",
+            "HTTP_CACHE_BACKEND": "memory",
+            "API_AUTH_KEY": "",
+            "HOST": "127.0.0.1",
+            "PORT": str(args.port),
+            "WEB_CONCURRENCY": str(args.workers),
+            "LOG_LEVEL": "WARNING",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        stub_args = [
+            "-m", "benchmarks.stubs", "--port", str(args.stub_port), "--latency", str(args.stub_latency),
+            "--error-rate", str(args.error_rate), "--burst-every", str(args.burst_every),
+            "--burst-length", str(args.burst_length), "--seed", "1",
+        ]
+        with _spawn(stub_args, {}), _spawn(["-m", "app.serve"], backend_env):
+            await _wait_ready(f"{stub_url}/stats")
+            await _wait_ready(f"{backend_url}/api/v1/health")
+            result = await run_load(backend_url, args)
+            async with httpx.AsyncClient() as client:
+                upstream = (await client.get(f"{stub_url}/stats")).json()
+        result["upstream"] = upstream
+        report(result, upstream)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
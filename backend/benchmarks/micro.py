@@ -0,0 +1,151 @@
+"""Micro-benchmarks of the CPU-bound hot paths, with saved baselines to compare against.
+
+Each case is timed like ``timeit``: the inner loop count is calibrated to run for about
+``--min-time`` seconds, then ``--repeat`` samples are taken and the best, median and
+spread reported per operation. ``--save`` writes the results as JSON and ``--compare``
+prints the change against such a file, so a perf change is measured before it is merged:
+
+    cd backend && python -m benchmarks.micro --save /tmp/before.json
+    # ...change something...
+    cd backend && python -m benchmarks.micro --compare /tmp/before.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from app.agent.context_packer import pack_context
+from app.agent.planner import planner
+from app.agent.registry import tool_registry
+from app.models.request_models import PlanRequest
+from app.models.response_models import IntermediateResult, PlanStep
+from app.services.analytics import QuantileSketch
+from app.services.rate_limiter import MemoryRateLimitBackend
+from app.tools import html_extract, pdf_extract
+
+from .stubs import CORPUS, _plan, make_pdf
+
+DESCRIPTIONS = [
+    "Search GitHub for python web framework sorted by stars",
+    "Web search for latest python frameworks 2024",
+    "Fetch https://docs.python.org/3/whatsnew/3.12.html",
+    "Extract the text of https://arxiv.org/pdf/1706.03762.pdf",
+    "Summarize the results of steps 1 and 2",
+    "Compare the most popular repositories and combine the findings",
+]
+TEXT_PLAN = "\n".join(
+    f"{i}. {line}" for i, line in enumerate(DESCRIPTIONS + ["Compile all the results into a report"], start=1)
+)
+
+
+def measure(fn: Callable[[], Any], min_time: float, repeat: int) -> dict[str, float]:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeat / elapsed) + 1))
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "best_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "stdev_us": statistics.pstdev(samples) * 1e6,
+        "ops_per_sec": 1 / min(samples),
+        "loops": number,
+    }
+
+
+def build_cases(tmp: Path) -> dict[str, Callable[[], Any]]:
+    loop = asyncio.new_event_loop()
+    structured = json.dumps(_plan("python async web frameworks with the most stars", "http://127.0.0.1:8099/"))
+    request = PlanRequest(goal="python async web frameworks", max_steps=8)
+    cases: dict[str, Callable[[], Any]] = {
+        "planner.parse_structured": lambda: planner._parse_structured(structured, 8),
+        "planner.parse_text": lambda: planner._parse_text(TEXT_PLAN, request),
+        "registry.select_tool": lambda: [tool_registry.select(d) for d in DESCRIPTIONS],
+    }
+
+    pages = [p.read_text(encoding="utf-8") for p in sorted(CORPUS.glob("*.html"))]
+    engines = ["stdlib"] + (["lxml"] if html_extract.select_engine() == "lxml" else [])
+    for engine in engines:
+        cases[f"html_extract.{engine}"] = lambda engine=engine: [
+            html_extract.extract(page, 10_000, engine) for page in pages
+        ]
+
+    pdf_path = tmp / "bench.pdf"
+    pdf_path.write_bytes(make_pdf(20))
+    cases["pdf_extract.20_pages"] = lambda: pdf_extract._extract_pages(str(pdf_path), 0, 20, 20_000)
+
+    backend = MemoryRateLimitBackend()
+    keys = [f"ip:10.0.{i // 256}.{i % 256}" for i in range(1000)]
+
+    async def limiter_round():
+        for key in keys:
+            await backend.hit(key, 60, 60.0)
+
+    cases["rate_limiter.1000_hits"] = lambda: loop.run_until_complete(limiter_round())
+
+    intermediate = [
+        IntermediateResult(
+            step=PlanStep(id=i, description=d),
+            result={"text": page[:6000], "title": d},
+        )
+        for i, (d, page) in enumerate(zip(DESCRIPTIONS, pages * 2), start=1)
+    ]
+    cases["context_packer.pack"] = lambda: pack_context("python web frameworks", intermediate, 2000)
+
+    sketch = QuantileSketch()
+    values = [0.001 * (1.07 ** (i % 200)) for i in range(1000)]
+    cases["analytics.sketch_1000_adds"] = lambda: [sketch.add(v) for v in values]
+    return cases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-time", type=float, default=1.0, help="Approximate seconds measured per case")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to compare against")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else {}
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(Path(tmp))
+        header = f"{'case':<30}{'best us':>12}{'median us':>12}{'stdev us':>11}{'ops/s':>12}"
+        print(header + ("  vs baseline" if baseline else ""))
+        for name, fn in cases.items():
+            if args.filter not in name:
+                continue
+            result = results[name] = measure(fn, args.min_time, args.repeat)
+            line = (
+                f"{name:<30}{result['best_us']:>12.1f}{result['median_us']:>12.1f}"
+                f"{result['stdev_us']:>11.1f}{result['ops_per_sec']:>12.1f}"
+            )
+            if name in baseline:
+                change = result["best_us"] / baseline[name]["best_us"] - 1
+                line += f"  {change:+.1%}"
+            print(line)
+    pdf_extract.shutdown_pool()
+    if args.save:
+        Path(args.save).write_text(json.dumps({"python": sys.version.split()[0], **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Per-request middleware overhead on ``/api/v1/health``.
+
+Compares the previous BaseHTTPMiddleware/function-middleware stack with the current pure
+ASGI stack, both measured against a bare app. Requests are driven in-process through
+``httpx.ASGITransport`` so network and server noise stay out of the numbers.
+
+    cd backend && python -m benchmarks.middleware_overhead --requests 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware import Middleware
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.middleware.auth import APIKeyAuthMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.timing import RequestTimingMiddleware
+from app.services.rate_limiter import MemoryRateLimitBackend
+
+API_KEY = "bench-key"
+LIMIT = 10_000_000
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    # The original implementation: a timestamp list per IP rebuilt on every request.
+    def __init__(self, app, max_requests: int = 60, window_seconds: int = 60):
+        super().__init__(app)
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._bucket: dict[str, list[float]] = {}
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host if request.client else "anonymous"
+        now = time.time()
+        bucket = self._bucket.setdefault(client_ip, [])
+        bucket[:] = [ts for ts in bucket if now - ts < self.window_seconds]
+        if len(bucket) >= self.max_requests:
+            return Response("Too Many Requests", 429)
+        bucket.append(now)
+        return await call_next(request)
+
+
+class LegacyAPIKeyAuthMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, api_key: str | None = None):
+        super().__init__(app)
+        self.api_key = api_key
+
+    async def dispatch(self, request: Request, call_next):
+        if self.api_key and request.headers.get("x-api-key") != self.api_key:
+            return Response("Unauthorized", 401)
+        return await call_next(request)
+
+
+def _cors() -> Middleware:
+    return Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+def build_app(stack: str) -> FastAPI:
+    if stack == "legacy":
+        middleware = [
+            _cors(),
+            Middleware(LegacyRateLimitMiddleware, max_requests=LIMIT),
+            Middleware(LegacyAPIKeyAuthMiddleware, api_key=API_KEY),
+        ]
+    elif stack == "asgi":
+        middleware = [
+            _cors(),
+            Middleware(RequestTimingMiddleware),
+            Middleware(RateLimitMiddleware, max_requests=LIMIT, backend=MemoryRateLimitBackend()),
+            Middleware(APIKeyAuthMiddleware, api_key=API_KEY, public_paths=()),
+        ]
+    else:
+        middleware = []
+
+    app = FastAPI(middleware=middleware)
+
+    @app.get("/api/v1/health")
+    async def health():
+        return JSONResponse({"status": "ok"})
+
+    if stack == "legacy":
+        # The no-op function middleware main.py used to register.
+        @app.middleware("http")
+        async def api_key_auth_middleware(request: Request, call_next):
+            return await call_next(request)
+
+    return app
+
+
+async def measure(stack: str, requests: int, warmup: int) -> list[float]:
+    transport = httpx.ASGITransport(app=build_app(stack))
+    headers = {"x-api-key": API_KEY}
+    samples: list[float] = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(warmup + requests):
+            start = time.perf_counter()
+            response = await client.get("/api/v1/health", headers=headers)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.status_code
+            if i >= warmup:
+                samples.append(elapsed)
+    return samples
+
+
+async def main(requests: int, warmup: int) -> None:
+    results = {stack: await measure(stack, requests, warmup) for stack in ("bare", "legacy", "asgi")}
+    bare = statistics.median(results["bare"])
+    print(f"{'stack':<8} {'p50 us':>9} {'p95 us':>9} {'overhead us':>12}")
+    for stack, samples in results.items():
+        samples.sort()
+        p50 = statistics.median(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{stack:<8} {p50 * 1e6:>9.1f} {p95 * 1e6:>9.1f} {(p50 - bare) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.warmup))
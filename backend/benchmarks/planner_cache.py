@@ -0,0 +1,107 @@
+"""Planner latency over a replayed goal log, with and without the plan cache.
+
+``goal_log.tsv`` holds 400 goals as users submit them: a few dozen intents, popular ones
+repeated often, each written a few ways (case, punctuation, word order, filler words).
+The first column is the intent id, used only to count plans reused for the wrong intent.
+
+The LLM is replaced by a stub that sleeps ``--llm-latency`` seconds and returns a JSON
+plan, so the numbers isolate what the cache saves.
+
+    cd backend && python -m benchmarks.planner_cache --llm-latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from app.agent.llm import llm_provider
+from app.agent.planner import planner
+from app.models.request_models import PlanRequest
+from app.services import plan_cache as plan_cache_module
+from app.services.plan_cache import PlanCache
+
+GOAL_LOG = Path(__file__).with_name("goal_log.tsv")
+
+
+def load_log() -> list[tuple[str, str]]:
+    rows = []
+    for line in GOAL_LOG.read_text(encoding="utf-8").splitlines():
+        intent, goal = line.split("\t", 1)
+        rows.append((intent, goal))
+    return rows
+
+
+def install_stub(latency: float, counter: list[int]) -> None:
+    async def complete(prompt: str, **kwargs) -> str:
+        counter[0] += 1
+        await asyncio.sleep(latency)
+        goal = prompt.split("Goal: ", 1)[-1].split("\n", 1)[0]
+        return json.dumps({
+            "summary": f"Plan for {goal}",
+            "steps": [
+                {"id": 1, "description": f"Web search for {goal}", "tool": "web_search", "args": {"query": goal}},
+                {"id": 2, "description": "Summarize the results of step 1", "tool": "summarize", "depends_on": [1]},
+            ],
+        })
+
+    llm_provider.complete = complete
+
+
+async def replay(rows: list[tuple[str, str]], cache: PlanCache) -> dict[str, float]:
+    # The planner reads the module-level cache; swap in the configuration under test.
+    import app.agent.planner as planner_module
+
+    planner_module.plan_cache = cache
+    intent_of_plan: dict[str, str] = {}
+    wrong = 0
+    latencies = []
+    for intent, goal in rows:
+        started = time.perf_counter()
+        plan = await planner.create_plan(PlanRequest(goal=goal), summarize=False)
+        latencies.append(time.perf_counter() - started)
+        owner = intent_of_plan.setdefault(plan.final_summary, intent)
+        if owner != intent:
+            wrong += 1
+    latencies.sort()
+    stats = cache.stats()
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "hit_ratio": stats["hit_ratio"],
+        "wrong_reuse": wrong,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per stubbed LLM call")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Similarity threshold to test")
+    args = parser.parse_args()
+
+    rows = load_log()
+    counter = [0]
+    install_stub(args.llm_latency, counter)
+    configs = {
+        "no cache": PlanCache(ttl=3600, max_entries=512, enabled=False),
+        "exact": PlanCache(ttl=3600, max_entries=512),
+        f"exact + similarity >= {args.threshold}": PlanCache(ttl=3600, max_entries=512, similarity=args.threshold),
+    }
+    print(f"{len(rows)} goals, {len({g for _, g in rows})} distinct strings, {len({i for i, _ in rows})} intents")
+    print(f"{'config':<32}{'llm calls':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'hit ratio':>11}{'wrong':>7}")
+    for name, cache in configs.items():
+        counter[0] = 0
+        result = await replay(rows, cache)
+        print(
+            f"{name:<32}{counter[0]:>10}{result['mean_ms']:>10.1f}{result['p50_ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}{result['hit_ratio']:>11.2f}{result['wrong_reuse']:>7}"
+        )
+    plan_cache_module.plan_cache.clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
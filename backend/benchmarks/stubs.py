@@ -0,0 +1,305 @@
+"""Local stand-ins for every upstream the backend calls, with injectable latency and faults.
+
+One server answers for all of them, each under its own path prefix:
+
+    /openai/v1/chat/completions   Groq (plain, JSON mode and SSE streaming)
+    /hf/models/{model}            Hugging Face Inference
+    /github/search/repositories   GitHub REST search (with X-RateLimit-* headers)
+    /github/graphql               GitHub GraphQL search
+    /serpapi/search.json          SerpAPI
+    /duckduckgo/html/             DuckDuckGo HTML results
+    /pages/{name}                 web pages from benchmarks/html_corpus (ETag + max-age)
+    /pdf/{pages}                  a generated PDF with that many pages of text
+
+Faults apply per upstream (the first path segment): a latency drawn around ``--latency``,
+``--error-rate`` 500s and, every ``--burst-every`` seconds, ``--burst-length`` seconds of
+429s with ``retry-after``. Groq answers JSON-mode prompts with a plan that uses the search
+tools and fetches a stub page, so ``/execute`` exercises every tool.
+
+    cd backend && python -m benchmarks.stubs --port 8099 --latency 0.15 --error-rate 0.02
+
+``env(base_url)`` gives the settings that point the backend at a running stub.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+CORPUS = Path(__file__).parent / "html_corpus"
+WORDS = (
+    "agent planner executor latency cache search repository framework python async stream token model "
+    "request response throughput benchmark summary result budget deadline retry fallback"
+).split()
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.05  # median seconds added to every upstream call
+    jitter: float = 0.5  # lognormal sigma; 0 gives a constant latency
+    error_rate: float = 0.0  # share of calls answered with a 500
+    burst_every: float = 0.0  # seconds between 429 bursts; 0 disables them
+    burst_length: float = 0.0  # seconds each 429 burst lasts
+    stream_chunks: int = 20  # SSE deltas per streamed completion
+    seed: int | None = None
+    started: float = field(default_factory=time.monotonic)
+
+
+def env(base_url: str) -> dict[str, str]:
+    base_url = base_url.rstrip("/")
+    return {
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"{base_url}/openai/v1",
+        "HF_API_KEY": "stub",
+        "HF_BASE_URL": f"{base_url}/hf/models",
+        "GITHUB_TOKEN": "stub",
+        "GITHUB_API_URL": f"{base_url}/github",
+        "SERP_API_KEY": "stub",
+        "SERPAPI_URL": f"{base_url}/serpapi/search.json",
+        "DUCKDUCKGO_URL": f"{base_url}/duckduckgo/html/",
+    }
+
+
+def make_pdf(pages: int, lines: int = 40) -> bytes:
+    """A minimal valid PDF with ``lines`` lines of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    font_id = 3
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for page in range(pages):
+        text = "".join(
+            f"({' '.join(WORDS[(page + line + i) % len(WORDS)] for i in range(10))}) Tj T* " for line in range(lines)
+        )
+        stream = zlib.compress(f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode())
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (font_id, content_id)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _words(seed: str, count: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _goal(prompt: str) -> str:
+    match = re.search(r"(?:Goal|Request): (.+)", prompt)
+    return match.group(1).strip() if match else prompt[:80]
+
+
+def _plan(goal: str, base_url: str) -> dict:
+    pages = sorted(p.stem for p in CORPUS.glob("*.html")) or ["missing"]
+    page = pages[int(hashlib.sha256(goal.encode()).hexdigest(), 16) % len(pages)]
+    return {
+        "summary": f"Search GitHub and the web for {goal}, read one page and combine the findings.",
+        "steps": [
+            {"id": 1, "description": f"Search GitHub for {goal}", "tool": "github_search", "args": {"query": goal}},
+            {"id": 2, "description": f"Web search for {goal}", "tool": "web_search", "args": {"query": goal}},
+            {"id": 3, "description": f"Fetch {base_url}pages/{page}", "tool": "web_fetch",
+             "args": {"query": f"{base_url}pages/{page}"}},
+            {"id": 4, "description": "Summarize the findings of steps 1, 2 and 3", "tool": "summarize",
+             "args": {"text": goal}, "depends_on": [1, 2, 3]},
+        ],
+    }
+
+
+def _completion(body: dict, base_url: str) -> tuple[str, dict]:
+    prompt = body["messages"][-1]["content"]
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        content = json.dumps(_plan(_goal(prompt), base_url))
+    elif prompt.startswith("Rewrite the request below"):
+        content = " ".join(_goal(prompt).split()[:5])
+    else:
+        content = _words(prompt, min(int(body.get("max_tokens", 800)) // 4, 200))
+    usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+    return content, usage
+
+
+def create_app(config: StubConfig | None = None) -> FastAPI:
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="upstream stubs")
+    app.state.config = config
+    app.state.calls = {}
+
+    @app.middleware("http")
+    async def faults(request: Request, call_next):
+        upstream = request.url.path.strip("/").split("/", 1)[0] or "root"
+        if upstream == "stats":
+            return await call_next(request)
+        counters = app.state.calls.setdefault(upstream, {"calls": 0, "errors": 0, "throttled": 0})
+        counters["calls"] += 1
+        if config.latency > 0:
+            delay = config.latency * (rng.lognormvariate(0, config.jitter) if config.jitter else 1.0)
+            await asyncio.sleep(delay)
+        if config.burst_every > 0:
+            phase = (time.monotonic() - config.started) % config.burst_every
+            if phase < config.burst_length:
+                counters["throttled"] += 1
+                retry_after = f"{config.burst_length - phase:.2f}"
+                return JSONResponse(
+                    {"error": "rate limited"},
+                    status_code=429,
+                    headers={"retry-after": retry_after, "x-ratelimit-remaining": "0"},
+                )
+        if config.error_rate and rng.random() < config.error_rate:
+            counters["errors"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        return await call_next(request)
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.calls
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq(request: Request):
+        body = await request.json()
+        content, usage = _completion(body, str(request.base_url))
+        model = body.get("model", "stub")
+        headers = {"x-ratelimit-remaining-requests": "1000", "x-ratelimit-remaining-tokens": "100000"}
+        if not body.get("stream"):
+            return JSONResponse(
+                {"model": model, "choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage},
+                headers=headers,
+            )
+
+        async def events():
+            words = content.split(" ")
+            size = max(1, len(words) // config.stream_chunks)
+            for i in range(0, len(words), size):
+                delta = " ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n"
+                await asyncio.sleep(config.latency / config.stream_chunks)
+            yield f"data: {json.dumps({'choices': [], 'x_groq': {'usage': usage}})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/hf/models/{model}")
+    async def huggingface(model: str, request: Request):
+        body = await request.json()
+        return [{"generated_text": _words(body.get("inputs", ""), 60)}]
+
+    def _repos(query: str) -> list[dict]:
+        rng_q = random.Random(query)
+        return [
+            {
+                "full_name": f"stub/{query.split()[0] if query.split() else 'repo'}-{i}",
+                "description": _words(f"{query}{i}", 12),
+                "stargazers_count": rng_q.randint(10, 50_000),
+                "html_url": f"https://github.com/stub/repo-{i}",
+                "language": rng_q.choice(["Python", "Go", "Rust", "TypeScript"]),
+            }
+            for i in range(5)
+        ]
+
+    @app.get("/github/search/repositories")
+    async def github_rest(q: str = ""):
+        reset = int(time.time()) + 60
+        return JSONResponse(
+            {"total_count": 5, "items": _repos(q)},
+            headers={"x-ratelimit-limit": "30", "x-ratelimit-remaining": "29", "x-ratelimit-reset": str(reset),
+                     "x-ratelimit-resource": "search"},
+        )
+
+    @app.post("/github/graphql")
+    async def github_graphql(request: Request):
+        body = await request.json()
+        data = {
+            name: {"nodes": [
+                {"nameWithOwner": r["full_name"], "description": r["description"], "stargazerCount": r["stargazers_count"],
+                 "url": r["html_url"], "primaryLanguage": {"name": r["language"]}}
+                for r in _repos(query)
+            ]}
+            for name, query in (body.get("variables") or {}).items()
+        }
+        return {"data": data}
+
+    @app.get("/serpapi/search.json")
+    async def serpapi(q: str = ""):
+        return {
+            "organic_results": [
+                {"title": f"{q} - result {i}", "snippet": _words(f"{q}{i}", 25), "link": f"https://example.com/{i}"}
+                for i in range(8)
+            ]
+        }
+
+    @app.get("/duckduckgo/html/")
+    async def duckduckgo(q: str = ""):
+        results = "".join(
+            f'<div class="result"><a class="result__a" href="https://example.com/{i}">{q} result {i}</a>'
+            f'<a class="result__snippet" href="https://example.com/{i}">{_words(q + str(i), 25)}</a></div>'
+            for i in range(8)
+        )
+        return HTMLResponse(f"<html><body>{results}</body></html>", headers={"cache-control": "max-age=60"})
+
+    @app.get("/pages/{name}")
+    async def page(name: str, request: Request):
+        path = CORPUS / f"{name}.html"
+        if not path.exists():
+            return Response(status_code=404)
+        html = path.read_bytes()
+        etag = '"' + hashlib.sha256(html).hexdigest()[:16] + '"'
+        headers = {"etag": etag, "cache-control": "max-age=60"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(html, media_type="text/html; charset=utf-8", headers=headers)
+
+    @app.get("/pdf/{pages}")
+    async def pdf(pages: int):
+        return Response(make_pdf(min(pages, 500)), media_type="application/pdf")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median seconds per upstream call")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Lognormal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing with 500")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="Seconds between 429 bursts (0: none)")
+    parser.add_argument("--burst-length", type=float, default=0.0, help="Seconds each 429 burst lasts")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()